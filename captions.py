@@ -0,0 +1,135 @@
+import os
+import re
+import json
+
+from pipeline_job import TIMINGS_PATH, CAPTIONS_PATH
+
+# Short-form captions: a few words at a time, big and centred
+MAX_WORDS = 3
+MAX_CHARS = 18
+MAX_GAP = 0.35          # a pause this long (seconds) always starts a new caption
+
+FONT = os.environ.get("AUTOTUBE_CAPTION_FONT", "DejaVu Sans")
+FONT_SIZE = 84
+MARGIN_V = 520          # distance from the bottom edge at 1080x1920
+
+
+def estimate_words(text, duration):
+    """
+    Word timings for engines that don't report them: spread `duration`
+    over the words in proportion to their length.
+    """
+    tokens = text.split()
+    if not tokens or duration <= 0:
+        return []
+    weights = [len(t) + 1 for t in tokens]
+    scale = duration / sum(weights)
+    words, t = [], 0.0
+    for token, w in zip(tokens, weights):
+        words.append([round(t, 3), round(t + w * scale, 3), token])
+        t += w * scale
+    return words
+
+
+def shift_words(words, offset=0.0, scale=1.0):
+    return [[round((s + offset) * scale, 3), round((e + offset) * scale, 3), w] for s, e, w in words]
+
+
+def group_cues(words, max_words=MAX_WORDS, max_chars=MAX_CHARS, max_gap=MAX_GAP):
+    """Merge word timings into caption cues of (start, end, text)."""
+    cues = []
+    current = []
+    for start, end, word in words:
+        if current:
+            text = " ".join(w for _, _, w in current + [[start, end, word]])
+            if (
+                len(current) >= max_words
+                or len(text) > max_chars
+                or start - current[-1][1] > max_gap
+                or re.search(r"[.!?]$", current[-1][2])
+            ):
+                cues.append(current)
+                current = []
+        current.append([start, end, word])
+    if current:
+        cues.append(current)
+
+    result = []
+    for i, cue in enumerate(cues):
+        start, end = cue[0][0], cue[-1][1]
+        # Hold each caption until the next one unless there is a real pause
+        if i + 1 < len(cues) and cues[i + 1][0][0] - end <= max_gap:
+            end = cues[i + 1][0][0]
+        result.append((start, end, " ".join(w for _, _, w in cue)))
+    return result
+
+
+def _srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def _ass_time(seconds):
+    cs = int(round(seconds * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def write_srt(cues, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i, (start, end, text) in enumerate(cues, 1):
+            f.write(f"{i}\n{_srt_time(start)} --> {_srt_time(end)}\n{text}\n\n")
+    return path
+
+
+def write_ass(cues, path, width=1080, height=1920):
+    """ASS script styled for vertical video, ready for ffmpeg's subtitles filter."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{FONT},{FONT_SIZE},&H00FFFFFF,&H000000FF,&H00000000,&H80000000,"
+        f"-1,0,0,0,100,100,0,0,1,6,2,2,60,60,{MARGIN_V},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for start, end, text in cues:
+        text = text.replace("{", "(").replace("}", ")").upper()
+        lines.append(f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Default,,0,0,0,,{text}")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def save_timings(sentences, words, path=TIMINGS_PATH):
+    """Store sentence and word timings (seconds into data/voice.mp3)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"sentences": sentences, "words": words}, f, indent=1)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_timings(path=TIMINGS_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,167 @@
+import numpy as np
+
+# Slideshow effects, each with two implementations that look the same:
+# an ffmpeg filter graph (native, used by the ffmpeg backend) and frame
+# transforms precomputed with NumPy (used by the MoviePy backend), so no
+# effect is driven by per-frame Python math.
+EFFECTS = ("kenburns", "xfade", "fade")
+
+KENBURNS_ZOOM = 0.12    # how far each still zooms over its segment
+XFADE_DURATION = 0.5    # crossfade between consecutive stills (seconds)
+FADE_DURATION = 0.5     # fade in from / out to black at the ends (seconds)
+
+
+def parse_effects(spec):
+    """"kenburns,fade" -> ("kenburns", "fade"); "" or "none" -> ()."""
+    if isinstance(spec, (list, tuple)):
+        names = list(spec)
+    else:
+        names = [n.strip() for n in (spec or "").split(",")]
+    names = [n for n in names if n and n != "none"]
+    for name in names:
+        if name not in EFFECTS:
+            raise ValueError(f"Unknown effect {name!r}, expected some of {EFFECTS}")
+    return tuple(dict.fromkeys(names))
+
+
+def xfade_duration(durations):
+    """Crossfade length, shortened so no still is ever fully covered."""
+    if len(durations) < 2:
+        return 0.0
+    return min(XFADE_DURATION, min(durations) / 2)
+
+
+def clip_lengths(durations, overlap):
+    """
+    Per-still lengths when consecutive stills overlap by `overlap` seconds.
+    Each still but the last runs `overlap` longer, so the cut points (and
+    the total length) stay exactly where the timeline put them.
+    """
+    return [d + overlap for d in durations[:-1]] + durations[-1:]
+
+# -----------------------------
+# ffmpeg filter graphs
+# -----------------------------
+def _zoompan(frames, width, height, fps, zoom_in):
+    progress = f"on/{max(frames - 1, 1)}"
+    if not zoom_in:
+        progress = f"(1-{progress})"
+    return (
+        f"zoompan=z='1+{KENBURNS_ZOOM}*{progress}'"
+        f":x='(iw-iw/zoom)/2':y='(ih-ih/zoom)/2'"
+        f":d={frames}:s={width}x{height}:fps={fps}"
+    )
+
+
+def ffmpeg_inputs(frame_files, segments):
+    """Input arguments: one still per timeline segment, decoded once."""
+    args = []
+    for seg in segments:
+        args += ["-i", frame_files[seg["image"]]]
+    return args
+
+
+def _hold(frames, fps):
+    # Repeat the single decoded frame; `-loop 1` would decode the JPEG every frame
+    return f"loop=loop={frames - 1}:size=1:start=0,setpts=N/({fps}*TB),fps={fps}"
+
+
+def ffmpeg_graph(durations, effects, width, height, fps, post_filters=()):
+    """
+    filter_complex for the n still inputs made by ffmpeg_inputs. The result is
+    labelled [v]; `post_filters` (captions, pixel format) run after the
+    effects in the same graph.
+    """
+    n = len(durations)
+    overlap = xfade_duration(durations) if "xfade" in effects else 0.0
+    lengths = clip_lengths(durations, overlap)
+    chains = []
+
+    for i, length in enumerate(lengths):
+        frames = max(round(length * fps), 1)
+        if "kenburns" in effects:
+            # zoompan repeats its single input frame `d` times by itself
+            source = _zoompan(frames, width, height, fps, zoom_in=i % 2 == 0)
+        else:
+            source = _hold(frames, fps)
+        chains.append(f"[{i}:v]{source},format=yuv420p,setsar=1[s{i}]")
+
+    if n == 1:
+        last = "s0"
+    elif overlap:
+        last, t = "s0", 0.0
+        for i in range(1, n):
+            t += durations[i - 1]
+            label = f"x{i}"
+            chains.append(
+                f"[{last}][s{i}]xfade=transition=fade:duration={overlap:.3f}:offset={t:.3f}[{label}]"
+            )
+            last = label
+    else:
+        chains.append("".join(f"[s{i}]" for i in range(n)) + f"concat=n={n}:v=1:a=0[cat]")
+        last = "cat"
+
+    tail = [f"fps={fps}"]
+    if "fade" in effects:
+        total = sum(durations)
+        fade = min(FADE_DURATION, total / 4)
+        tail += [f"fade=t=in:st=0:d={fade:.3f}", f"fade=t=out:st={total - fade:.3f}:d={fade:.3f}"]
+    tail += list(post_filters)
+    chains.append(f"[{last}]{','.join(tail)}[v]")
+    return ";".join(chains)
+
+# -----------------------------
+# NumPy transforms (MoviePy)
+# -----------------------------
+def kenburns_maps(frames, width, height, zoom_in=True):
+    """
+    Source row/column indices for every output frame of a centred zoom,
+    computed up front: rendering a frame is then one array gather
+    (nearest-neighbour) instead of a crop and resize.
+    """
+    progress = np.linspace(0.0, 1.0, max(frames, 1))
+    if not zoom_in:
+        progress = progress[::-1]
+    scale = 1.0 / (1.0 + KENBURNS_ZOOM * progress)           # visible fraction
+    out_y = (np.arange(height) + 0.5) / height - 0.5
+    out_x = (np.arange(width) + 0.5) / width - 0.5
+    rows = ((0.5 + np.outer(scale, out_y)) * height).astype(np.int32)
+    cols = ((0.5 + np.outer(scale, out_x)) * width).astype(np.int32)
+    return np.clip(rows, 0, height - 1), np.clip(cols, 0, width - 1)
+
+
+def kenburns_frames(image, duration, fps, zoom_in=True):
+    """frame_function(t) for a Ken Burns zoom over `image` (H x W x 3 array)."""
+    height, width = image.shape[:2]
+    frames = max(round(duration * fps), 1)
+    rows, cols = kenburns_maps(frames, width, height, zoom_in)
+
+    def frame_function(t):
+        i = min(int(t * fps), frames - 1)
+        return image[rows[i][:, None], cols[i][None, :]]
+
+    return frame_function
+
+
+def crossfade_frames(frame_a, frame_b, start_a, overlap, fps):
+    """
+    frame_function(t) for the `overlap` seconds where still A (from its own
+    time `start_a` on) fades into still B (from its start). Only these
+    short windows are blended; the stills in between are passed through.
+    """
+    frames = max(round(overlap * fps), 1)
+    weights = np.linspace(0.0, 1.0, frames + 2, dtype=np.float32)[1:-1]
+
+    def frame_function(t):
+        w = weights[min(int(t * fps), frames - 1)]
+        a = frame_a(start_a + t).astype(np.float32)
+        return (a + (frame_b(t) - a) * w).astype(np.uint8)
+
+    return frame_function
+
+
+def fade_weights(frames, fps, total, fade=FADE_DURATION):
+    """Brightness multiplier per output frame for fade in/out, precomputed."""
+    fade = min(fade, total / 4)
+    t = np.arange(frames) / fps
+    return np.clip(np.minimum(t / fade, (total - t) / fade), 0.0, 1.0).astype(np.float32)
@@ -1,13 +1,55 @@
 import os
 import random
+import threading
+import time
 import requests
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
+import media_cache
 from api_keys import PEXELS_API_KEY, PIXABAY_API_KEY
 
 IMAGES_DIR = "assets/images"
 DATA_DIR = "data"
 
+# Download engine tuning
+DOWNLOAD_WORKERS = 8        # total images in flight
+SEARCH_WORKERS = 8          # provider searches in flight
+# Connections kept per host: one per thread that can share the session,
+# so no thread ever opens a connection the pool then has to discard
+POOL_SIZE = max(DOWNLOAD_WORKERS, SEARCH_WORKERS)
+MAX_PER_HOST = 4            # in-flight requests per CDN host
+CHUNK_SIZE = 64 * 1024      # bytes written per chunk
+
+_session = None
+_session_lock = threading.Lock()
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def get_session():
+    """One pooled HTTP session shared by every request in this stage."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE,
+                pool_maxsize=POOL_SIZE,
+            )
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def host_slot(url):
+    host = urllib.parse.urlparse(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_slots[host]
+
 # -----------------------------
 # 1. Read script / title / image_query
 # -----------------------------
@@ -103,7 +145,7 @@ def download_from_pexels(query, max_images=6):
     headers = {"Authorization": PEXELS_API_KEY}
 
     try:
-        r = requests.get(url, headers=headers, params=params, timeout=15)
+        r = get_session().get(url, headers=headers, params=params, timeout=15)
         r.raise_for_status()
     except Exception as e:
         print("❌ Pexels request failed:", e)
@@ -140,7 +182,7 @@ def download_from_pixabay(query, max_images=6):
     }
 
     try:
-        r = requests.get(url, params=params, timeout=15)
+        r = get_session().get(url, params=params, timeout=15)
         r.raise_for_status()
     except Exception as e:
         print("❌ Pixabay request failed:", e)
@@ -156,8 +198,122 @@ def download_from_pixabay(query, max_images=6):
 
 
 # -----------------------------
-# 5. Save images locally
+# 5. Search all providers at once
 # -----------------------------
+SEARCH_PROVIDERS = [
+    ("pexels", download_from_pexels),
+    ("pixabay", download_from_pixabay),
+]
+
+
+def cached_search(provider, fn, query, max_images):
+    urls = media_cache.get_search(provider, query, max_images)
+    if urls is not None:
+        print(f"💾 Cached {provider} search: {query!r}")
+        return urls
+
+    urls = fn(query, max_images)
+    if urls:
+        media_cache.put_search(provider, query, max_images, urls)
+    return urls
+
+
+def search_images(queries, want=12, max_images=6):
+    """
+    Send every provider/query pair concurrently and stop as soon as `want`
+    unique URLs have arrived. Requests that have not started are cancelled;
+    in-flight ones finish in the background (bounded by their 15s timeout)
+    and their results are dropped.
+
+    Results are merged in (query, provider) order, not arrival order, so the
+    same set of responses always yields the same URL list.
+    """
+    pairs = [(q, name, fn) for q in queries for name, fn in SEARCH_PROVIDERS]
+    if not pairs:
+        return []
+
+    start = time.perf_counter()
+    results = {}
+    seen = set()
+
+    pool = ThreadPoolExecutor(max_workers=min(len(pairs), SEARCH_WORKERS))
+    futures = {
+        pool.submit(cached_search, name, fn, q, max_images): idx
+        for idx, (q, name, fn) in enumerate(pairs)
+    }
+    try:
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            try:
+                results[idx] = fut.result()
+            except Exception as e:
+                print("❌ Search failed:", e)
+                continue
+            seen.update(results[idx])
+            if len(seen) >= want:
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    merged = []
+    merged_seen = set()
+    for idx in sorted(results):
+        for u in results[idx]:
+            if u not in merged_seen:
+                merged_seen.add(u)
+                merged.append(u)
+
+    print(
+        f"⏱️ Search: {len(merged)} unique URLs from {len(results)}/{len(pairs)} "
+        f"requests in {time.perf_counter() - start:.2f}s"
+    )
+    return merged
+
+
+# -----------------------------
+# 6. Save images locally
+# -----------------------------
+def image_ext(url):
+    ext = ".jpg"
+    parsed = urllib.parse.urlparse(url)
+    if parsed.path.lower().endswith((".png", ".webp", ".jpeg", ".jpg")):
+        ext = os.path.splitext(parsed.path)[1]
+    return ext
+
+
+def download_image(url, out_path):
+    """
+    Stream one image into the cache and hard-link it to `out_path`.
+    Returns (seconds taken, cache hit).
+    """
+    start = time.perf_counter()
+    ext = os.path.splitext(out_path)[1]
+
+    cached = media_cache.get_image(url, ext)
+    if cached:
+        media_cache.link_into(cached, out_path)
+        return time.perf_counter() - start, True
+
+    blob_path = media_cache.image_path(url, ext)
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    # Batch workers in other processes share the cache, so the name must be unique across them
+    tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with host_slot(url):
+            with get_session().get(url, timeout=20, stream=True) as resp:
+                resp.raise_for_status()
+                with open(tmp_path, "wb") as f:
+                    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+        os.replace(tmp_path, blob_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    media_cache.link_into(blob_path, out_path)
+    return time.perf_counter() - start, False
+
+
 def save_images(urls, max_total=10):
     os.makedirs(IMAGES_DIR, exist_ok=True)
 
@@ -168,30 +324,44 @@ def save_images(urls, max_total=10):
     selected = urls[:max_total]
     print(f"⬇️ Downloading {len(selected)} images...")
 
-    saved = []
+    jobs = []
     for i, url in enumerate(selected):
-        ext = ".jpg"
-        parsed = urllib.parse.urlparse(url)
-        if parsed.path.lower().endswith((".png", ".webp", ".jpeg", ".jpg")):
-            ext = os.path.splitext(parsed.path)[1]
-
-        out_path = os.path.join(IMAGES_DIR, f"car_{i}{ext}")
-
-        try:
-            resp = requests.get(url, timeout=20)
-            resp.raise_for_status()
-            with open(out_path, "wb") as f:
-                f.write(resp.content)
-            saved.append(out_path)
-            print(f"✅ {out_path}")
-        except Exception as e:
-            print(f"❌ Failed {url}: {e}")
-
+        out_path = os.path.join(IMAGES_DIR, f"car_{i}{image_ext(url)}")
+        jobs.append((url, out_path))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        futures = [pool.submit(download_image, url, out_path) for url, out_path in jobs]
+
+        # Collect in index order so car_{i} naming and the returned list stay stable
+        saved = []
+        hits = 0
+        for (url, out_path), fut in zip(jobs, futures):
+            try:
+                elapsed, hit = fut.result()
+                saved.append(out_path)
+                hits += hit
+                print(f"✅ {out_path} ({elapsed:.2f}s{', cached' if hit else ''})")
+            except Exception as e:
+                print(f"❌ Failed {url}: {e}")
+
+    total = time.perf_counter() - start
+    print(
+        f"⏱️ Downloaded {len(saved)}/{len(selected)} images in {total:.2f}s "
+        f"({hits} from cache)"
+    )
+
+    evicted = media_cache.evict_images()
+    if evicted:
+        print(f"🧹 Evicted {evicted} old images from cache")
     return saved
 
 
-def main():
-    title, script, image_query = load_text()
+def main(job=None):
+    if job is not None:
+        title, script, image_query = job.title.lower(), job.script.lower(), job.image_query.strip()
+    else:
+        title, script, image_query = load_text()
 
     if image_query:
         print("\n🧠 Using AI image_query from model:", image_query)
@@ -202,29 +372,11 @@ def main():
         base_keywords = topic
 
     queries = build_queries(base_keywords)
-
-    all_urls = []
-    for q in queries:
-        if len(all_urls) >= 12:
-            break
-        all_urls.extend(download_from_pexels(q, max_images=6))
-        all_urls.extend(download_from_pixabay(q, max_images=6))
-
-    seen = set()
-    clean_urls = []
-    for u in all_urls:
-        if u not in seen:
-            seen.add(u)
-            clean_urls.append(u)
+    clean_urls = search_images(queries, want=12, max_images=6)
 
     if not clean_urls:
         print("⚠️ No images found. Falling back to generic 'supercar'.")
-        fallback_queries = build_queries("supercar")
-        for q in fallback_queries:
-            if len(clean_urls) >= 10:
-                break
-            clean_urls.extend(download_from_pexels(q, max_images=6))
-            clean_urls.extend(download_from_pixabay(q, max_images=6))
+        clean_urls = search_images(build_queries("supercar"), want=10, max_images=6)
 
     if not clean_urls:
         raise SystemExit("❌ Still no images found. Check API keys or internet.")
@@ -235,6 +387,10 @@ def main():
     for s in saved:
         print("   ", s)
 
+    if job is not None:
+        job.image_paths = saved
+    return job
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,64 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageFilter, ImageOps
+
+import media_cache
+
+FRAME_WIDTH = 1080
+FRAME_HEIGHT = 1920
+
+# If cropping to 9:16 would keep less than this share of the image width,
+# fit the whole photo over a blurred copy of itself instead of cropping.
+MIN_CROP_KEEP = 0.6
+
+
+def frame_cache_path(src_path, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    digest = media_cache.file_sha256(src_path)
+    return os.path.join(media_cache.FRAME_DIR, f"{digest}_{width}x{height}.jpg")
+
+
+def normalize_image(src_path, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    """
+    Decode one photo, crop or pad it to exactly width x height and cache
+    the result by source hash. Returns the cached frame path.
+    """
+    out_path = frame_cache_path(src_path, width, height)
+    if os.path.exists(out_path):
+        os.utime(out_path)
+        return out_path
+
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        src_ratio = im.width / im.height
+        target_ratio = width / height
+
+        if min(src_ratio, target_ratio) / max(src_ratio, target_ratio) >= MIN_CROP_KEEP:
+            frame = ImageOps.fit(im, (width, height), Image.LANCZOS)
+        else:
+            # Very wide/tall photo: blurred fill behind the whole image
+            frame = ImageOps.fit(im, (width // 8, height // 8), Image.BILINEAR)
+            frame = frame.filter(ImageFilter.GaussianBlur(6)).resize((width, height), Image.BILINEAR)
+            fg = ImageOps.contain(im, (width, height), Image.LANCZOS)
+            frame.paste(fg, ((width - fg.width) // 2, (height - fg.height) // 2))
+
+    os.makedirs(media_cache.FRAME_DIR, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    frame.save(tmp_path, "JPEG", quality=92)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def normalize_images(image_files, width=FRAME_WIDTH, height=FRAME_HEIGHT, workers=None):
+    """Normalize all images in parallel, keeping the input order."""
+    start = time.perf_counter()
+    workers = workers or min(len(image_files), os.cpu_count() or 1) or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(normalize_image, f, width, height) for f in image_files]
+        frames = [fut.result() for fut in futures]
+
+    print(f"🖼️ Normalized {len(frames)} images to {width}x{height} in {time.perf_counter() - start:.2f}s")
+    media_cache.evict_lru(media_cache.FRAME_DIR, media_cache.FRAME_CACHE_MAX_BYTES)
+    return frames
@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+import media_cache
+
+DB_PATH = os.path.join(media_cache.CACHE_DIR, "ollama.sqlite")
+
+
+def _connect():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            response TEXT NOT NULL,
+            created REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    return conn
+
+
+def request_key(model, prompt, options, fmt=None):
+    """Key on everything that changes the output: model, prompt, sampling options, format."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    blob = json.dumps(
+        {
+            "model": model,
+            "prompt": prompt_hash,
+            "options": options,
+            "format": fmt,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest(), prompt_hash
+
+
+def get(key):
+    conn = _connect()
+    try:
+        with conn:
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (key,))
+        return row[0]
+    finally:
+        conn.close()
+
+
+def put(key, model, prompt_hash, response):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, prompt_hash, response, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, prompt_hash, response, time.time()),
+            )
+    finally:
+        conn.close()
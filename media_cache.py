@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+# Shared across runs (and batch jobs), so it lives next to the scripts
+# rather than under the per-run data/ or assets/ folders.
+CACHE_DIR = os.environ.get(
+    "AUTOTUBE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"),
+)
+SEARCH_DIR = os.path.join(CACHE_DIR, "search")
+IMAGE_DIR = os.path.join(CACHE_DIR, "images")
+FRAME_DIR = os.path.join(CACHE_DIR, "frames")
+AUDIO_DIR = os.path.join(CACHE_DIR, "audio")
+TTS_DIR = os.path.join(CACHE_DIR, "tts")
+
+SEARCH_TTL = 24 * 3600                  # seconds a search result stays fresh
+IMAGE_CACHE_MAX_BYTES = 500 * 1024**2   # LRU bound for downloaded images
+FRAME_CACHE_MAX_BYTES = 300 * 1024**2   # LRU bound for normalized frames
+AUDIO_CACHE_MAX_BYTES = 200 * 1024**2   # LRU bound for processed narration
+TTS_CACHE_MAX_BYTES = 200 * 1024**2     # LRU bound for per-sentence TTS audio
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# -----------------------------
+# Search results (provider + query, TTL)
+# -----------------------------
+def search_key(provider, query, max_images):
+    return _sha256(f"{provider}\0{query}\0{max_images}")
+
+
+def get_search(provider, query, max_images):
+    path = os.path.join(SEARCH_DIR, search_key(provider, query, max_images) + ".json")
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get("created", 0) > SEARCH_TTL:
+        return None
+    return entry.get("urls")
+
+
+def put_search(provider, query, max_images, urls):
+    os.makedirs(SEARCH_DIR, exist_ok=True)
+    path = os.path.join(SEARCH_DIR, search_key(provider, query, max_images) + ".json")
+    entry = {
+        "provider": provider,
+        "query": query,
+        "created": time.time(),
+        "urls": urls,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+
+# -----------------------------
+# Image bytes (URL hash, size-bounded LRU)
+# -----------------------------
+def image_path(url, ext):
+    return os.path.join(IMAGE_DIR, _sha256(url) + ext)
+
+
+def get_image(url, ext):
+    """Return the cached file for `url`, marking it as recently used."""
+    path = image_path(url, ext)
+    if not os.path.exists(path):
+        return None
+    os.utime(path)
+    return path
+
+
+def link_into(src, dst):
+    """Hard-link a cached file into place, copying if the link is not possible."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def evict_images(max_bytes=IMAGE_CACHE_MAX_BYTES):
+    return evict_lru(IMAGE_DIR, max_bytes)
+
+
+def evict_lru(directory, max_bytes):
+    """Delete least recently used files until `directory` fits in `max_bytes`."""
+    if not os.path.isdir(directory):
+        return 0
+
+    entries = []
+    total = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
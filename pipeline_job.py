@@ -0,0 +1,110 @@
+import os
+import glob
+import uuid
+from dataclasses import dataclass, field
+
+DATA_DIR = "data"
+IMAGES_DIR = "assets/images"
+
+# Text fields produced by the generator, stored as data/<name>.txt
+TEXT_FIELDS = ("title", "description", "hashtags", "script", "image_query")
+
+# Where each stage leaves its file artifacts
+VOICE_PATH = os.path.join(DATA_DIR, "voice.mp3")
+TIMINGS_PATH = os.path.join(DATA_DIR, "timings.json")
+CAPTIONS_PATH = os.path.join(DATA_DIR, "captions.srt")
+TIMELINE_PATH = os.path.join(DATA_DIR, "timeline.json")
+VIDEO_PATH = "assets/latest_video/final.mp4"
+VIDEO_ID_PATH = os.path.join(DATA_DIR, "video_id.txt")
+# Not under assets/images: the downloader clears that folder and the
+# video stage renders every image in it
+THUMBNAIL_PATH = "assets/thumbnails/thumbnail.jpg"
+# Identifies the video being made here; kept by --resume, replaced by a fresh run
+JOB_ID_PATH = os.path.join(DATA_DIR, "job_id.txt")
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.webp")
+
+
+def image_files():
+    files = []
+    for p in IMAGE_PATTERNS:
+        files.extend(glob.glob(os.path.join(IMAGES_DIR, p)))
+    return sorted(files)
+
+
+def job_id():
+    """This directory's job id, created on first use."""
+    try:
+        with open(JOB_ID_PATH) as f:
+            value = f.read().strip()
+        if value:
+            return value
+    except OSError:
+        pass
+    value = uuid.uuid4().hex[:12]
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(JOB_ID_PATH, "w") as f:
+        f.write(value)
+    return value
+
+
+@dataclass
+class Job:
+    """
+    State handed from stage to stage when the pipeline runs in-process.
+    Paths are relative to `workdir`, which stages treat as their cwd.
+    """
+    workdir: str = "."
+    topic: str = ""
+
+    title: str = ""
+    description: str = ""
+    hashtags: str = ""
+    script: str = ""
+    image_query: str = ""
+
+    voice_path: str = ""
+    image_paths: list = field(default_factory=list)
+    thumbnail_path: str = ""
+    video_path: str = ""
+    video_id: str = ""
+
+    # stage name -> (startup seconds, run seconds)
+    stage_times: dict = field(default_factory=dict)
+
+    def text_path(self, name):
+        return os.path.join(DATA_DIR, f"{name}.txt")
+
+    def set_text(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, (value or "").strip())
+
+    def save_text(self):
+        """Write the text fields to data/*.txt, where later stages and --resume read them."""
+        os.makedirs(DATA_DIR, exist_ok=True)
+        for name in TEXT_FIELDS:
+            with open(self.text_path(name), "w") as f:
+                f.write(getattr(self, name))
+
+    def load_text(self):
+        """Refresh the text fields from data/*.txt, e.g. after a human edit."""
+        for name in TEXT_FIELDS:
+            path = self.text_path(name)
+            if os.path.exists(path):
+                with open(path) as f:
+                    setattr(self, name, f.read().strip())
+        return self
+
+    def load_artifacts(self):
+        """Rebuild the whole job from files left by an earlier run."""
+        self.load_text()
+        if os.path.exists(VOICE_PATH):
+            self.voice_path = VOICE_PATH
+        self.image_paths = image_files()
+        if os.path.exists(THUMBNAIL_PATH):
+            self.thumbnail_path = THUMBNAIL_PATH
+        if os.path.exists(VIDEO_PATH):
+            self.video_path = VIDEO_PATH
+        if os.path.exists(VIDEO_ID_PATH):
+            with open(VIDEO_ID_PATH) as f:
+                self.video_id = f.read().strip()
+        return self
@@ -2,39 +2,642 @@ import subprocess
 import sys
 import shutil
 import os
+import time
+import argparse
+import importlib
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def clean_assets():
+import stage_cache
+import pipeline_job
+import upload_queue
+import review_queue
+import topic_index
+from pipeline_job import Job
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+JOBS_DIR = os.path.join(ROOT_DIR, "jobs")
+
+# Files a job needs from the project root (API credentials)
+SHARED_FILES = ["client_secret.json", "token.json"]
+
+def clean_assets(base_dir="."):
     folders = [
         "assets/audio",
         "assets/videos",
         "assets/subtitles",
-        "assets/images"
+        "assets/images",
+        "assets/thumbnails"
     ]
     for folder in folders:
-        if os.path.exists(folder):
-            shutil.rmtree(folder)
-        os.makedirs(folder, exist_ok=True)
-
-clean_assets()
+        path = os.path.join(base_dir, folder)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
 
 steps = [
     ("Generating AI content", "script_caption_hashtags_ollama.py"),
     ("Reviewing content", "review_and_confirm.py"),
     ("Creating Microsoft voiceover", "voiceover_ms.py"),
     ("Downloading images", "image_downloader.py"),
+    ("Making thumbnail", "thumbnail_generator.py"),
     ("Making slideshow video", "video_creator_advanced.py"),
     ("Uploading to YouTube", "youtube_uploader.py"),
 ]
 
-def run_step(name, script):
-    print(f"\n=== {name} ({script}) ===")
-    result = subprocess.run([sys.executable, script])
+# With --queue-uploads the last stage only queues the video; a separate
+# upload worker sends it while the next video renders.
+QUEUE_STEP = ("Queueing upload", "upload_queue.py")
+
+# With --review-queue the review stage only submits the draft. These stages
+# run on it speculatively while it waits; the rest wait for the decision.
+REVIEW_QUEUE_STEP = ("Submitting for review", "review_queue.py")
+SPECULATIVE_STAGES = ("voice", "images", "thumbnail")
+
+
+def pipeline_steps(queue_uploads=False, queue_reviews=False):
+    chain = list(steps)
+    if queue_reviews:
+        chain[1] = REVIEW_QUEUE_STEP
+    if queue_uploads:
+        chain[-1] = QUEUE_STEP
+    return chain
+
+
+# Batch mode splits the chain in two lanes: content generation (one local
+# LLM, run serially) and production (everything after, run in parallel).
+GENERATION_STEPS = steps[:2]
+PRODUCTION_STEPS = steps[2:]
+
+
+def production_steps(queue_uploads=False):
+    return pipeline_steps(queue_uploads)[len(GENERATION_STEPS):]
+
+
+def generation_steps(review=False, queue_reviews=False):
+    if queue_reviews:
+        return pipeline_steps(queue_reviews=True)[:len(GENERATION_STEPS)]
+    return GENERATION_STEPS if review else GENERATION_STEPS[:1]
+
+
+STAGE_MODES = ("inprocess", "subprocess")
+
+
+def _text_files(*names):
+    return [os.path.join(pipeline_job.DATA_DIR, f"{n}.txt") for n in names]
+
+
+def _image_inputs():
+    # The downloader only falls back to title/script when image_query is empty
+    iq_path = _text_files("image_query")[0]
+    if os.path.exists(iq_path):
+        with open(iq_path) as f:
+            if f.read().strip():
+                return [iq_path]
+    return _text_files("image_query", "title", "script")
+
+
+def _env(*names):
+    return {n: os.environ.get(n, "") for n in names}
+
+
+# Per-stage dependency declarations for --resume: short name, input files,
+# extra parameters that affect the output, and the outputs to keep.
+STAGE_SPECS = {
+    "script_caption_hashtags_ollama.py": {
+        "key": "generate",
+        "inputs": lambda: [],
+        "params": lambda: _env("AUTOTUBE_TOPIC"),
+        "outputs": lambda: _text_files(*pipeline_job.TEXT_FIELDS),
+    },
+    "review_and_confirm.py": {
+        "key": "review",
+        "inputs": lambda: _text_files(*pipeline_job.TEXT_FIELDS),
+        "params": lambda: {},
+        "outputs": lambda: _text_files(*pipeline_job.TEXT_FIELDS),
+    },
+    # Recorded once the reviewer approves, not when the draft is submitted
+    "review_queue.py": {
+        "key": "review",
+        "inputs": lambda: _text_files(*pipeline_job.TEXT_FIELDS),
+        "params": lambda: {},
+        "outputs": lambda: [review_queue.REVIEW_ID_PATH],
+    },
+    "voiceover_ms.py": {
+        "key": "voice",
+        "inputs": lambda: _text_files("script"),
+        "params": lambda: _env(
+            "AUTOTUBE_TTS", "AUTOTUBE_TTS_FALLBACK", "AUTOTUBE_PIPER_MODEL", "AUTOTUBE_ESPEAK_VOICE",
+        ),
+        "outputs": lambda: [pipeline_job.VOICE_PATH, pipeline_job.TIMINGS_PATH, pipeline_job.CAPTIONS_PATH],
+    },
+    "image_downloader.py": {
+        "key": "images",
+        "inputs": _image_inputs,
+        "params": lambda: {},
+        "outputs": pipeline_job.image_files,
+    },
+    "thumbnail_generator.py": {
+        "key": "thumbnail",
+        "inputs": lambda: [*_text_files("title"), *pipeline_job.image_files()],
+        "params": lambda: _env("AUTOTUBE_THUMBNAIL_FONT"),
+        "outputs": lambda: [pipeline_job.THUMBNAIL_PATH],
+    },
+    "video_creator_advanced.py": {
+        "key": "video",
+        "inputs": lambda: [pipeline_job.VOICE_PATH, pipeline_job.TIMINGS_PATH, *pipeline_job.image_files()],
+        "params": lambda: _env(
+            "AUTOTUBE_RENDER_BACKEND", "AUTOTUBE_RENDER_PROFILE", "AUTOTUBE_RENDER_BUDGET",
+            "AUTOTUBE_CAPTIONS", "AUTOTUBE_CAPTION_FONT", "AUTOTUBE_EFFECTS",
+        ),
+        "outputs": lambda: [pipeline_job.VIDEO_PATH],
+    },
+    "youtube_uploader.py": {
+        "key": "upload",
+        "inputs": lambda: [
+            pipeline_job.VIDEO_PATH, pipeline_job.THUMBNAIL_PATH,
+            *_text_files("title", "description", "hashtags"),
+        ],
+        "params": lambda: {},
+        "outputs": lambda: [pipeline_job.VIDEO_ID_PATH],
+    },
+    # Same stage key as the direct upload, so --from-stage upload works in both modes
+    "upload_queue.py": {
+        "key": "upload",
+        "inputs": lambda: [
+            pipeline_job.VIDEO_PATH, pipeline_job.THUMBNAIL_PATH,
+            *_text_files("title", "description", "hashtags"),
+        ],
+        "params": lambda: {},
+        "outputs": lambda: [upload_queue.QUEUE_ID_PATH],
+    },
+}
+STAGE_KEYS = [STAGE_SPECS[script]["key"] for _, script in steps]
+
+
+def stage_input_key(script):
+    spec = STAGE_SPECS[script]
+    return stage_cache.input_key(os.path.join(ROOT_DIR, script), spec["inputs"](), spec["params"]())
+
+
+class StepFailed(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def workdir(path):
+    prev = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+def run_step(name, script, cwd=None, env=None, label=""):
+    """Run a stage in its own interpreter. Returns wall seconds."""
+    print(f"\n=== {label}{name} ({script}) ===")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT_DIR, script)],
+        cwd=cwd,
+        env=env,
+    )
     if result.returncode != 0:
-        print(f"❌ Step failed: {name}")
-        sys.exit(result.returncode)
-    print(f"✅ Finished: {name}")
+        print(f"❌ {label}Step failed: {name}")
+        raise StepFailed(name, result.returncode)
+    print(f"✅ {label}Finished: {name}")
+    return time.perf_counter() - start
+
+
+def run_stage(name, script, job, label=""):
+    """
+    Import the stage module and call its main(job) in this process.
+    Records (import seconds, run seconds) in job.stage_times; the import
+    cost is only paid the first time a module is loaded.
+    """
+    print(f"\n=== {label}{name} ({script}) [in-process] ===")
+    module_name = os.path.splitext(script)[0]
+
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+    except Exception:
+        traceback.print_exc()
+        print(f"❌ {label}Step failed: {name}")
+        raise StepFailed(name, 1)
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        module.main(job)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"❌ {label}Step failed: {name}")
+            raise StepFailed(name, e.code if isinstance(e.code, int) else 1)
+    except Exception:
+        traceback.print_exc()
+        print(f"❌ {label}Step failed: {name}")
+        raise StepFailed(name, 1)
+
+    job.stage_times[name] = (startup, time.perf_counter() - start)
+    print(f"✅ {label}Finished: {name}")
+
+
+def stage_runner(job, mode, manifest, env=None, label="", reload_text=False):
+    """
+    run(name, script) for one job: runs the stage in `mode`, records its
+    input key in `manifest` and returns its (startup, run) seconds.
+    """
+    def run(name, script):
+        spec = STAGE_SPECS[script]
+        if reload_text:
+            # Pick up edits a reviewer made to data/*.txt in the meantime
+            job.load_text()
+        # Keyed before the run, so an edit made while the stage runs marks it stale
+        key = stage_input_key(script)
+        if mode == "inprocess":
+            run_stage(name, script, job, label=label)
+            times = job.stage_times[name]
+        else:
+            times = (None, run_step(name, script, env=env, label=label))
+
+        if script == "review_and_confirm.py":
+            # Review edits its own inputs: only skip it next time if nothing
+            # changed since it finished
+            key = stage_input_key(script)
+        if script != REVIEW_QUEUE_STEP[1]:
+            stage_cache.record(manifest, spec["key"], key, spec["outputs"]())
+        return times
+
+    return run
+
+
+def await_review(job, speculative, run, manifest, label=""):
+    """
+    Block until the draft submitted by review_queue.py is decided. On
+    approval, redo only the `speculative` stages whose inputs the reviewer's
+    edits changed (the voiceover then re-synthesizes just the edited
+    sentences; the rest come from its per-sentence cache). On rejection,
+    stop the job, as when AUTOTUBE_REVIEW_TIMEOUT passes without a decision.
+    """
+    try:
+        review = review_queue.wait(
+            review_queue.current_id(), label=label, timeout=review_queue.REVIEW_TIMEOUT
+        )
+    except TimeoutError as e:
+        print(f"❌ {label}Stopping this job: {e}")
+        raise StepFailed("Review", 1)
+    if review["status"] != "approved":
+        print(f"❌ {label}Stopping this job: {review['note'] or 'no reason given'}")
+        raise StepFailed("Review", 1)
+
+    job.load_text()
+    topic_index.add_job(job)
+    script = REVIEW_QUEUE_STEP[1]
+    stage_cache.record(manifest, "review", stage_input_key(script), STAGE_SPECS[script]["outputs"]())
+
+    for name, script in speculative:
+        if stage_cache.is_fresh(manifest, STAGE_SPECS[script]["key"], stage_input_key(script)):
+            print(f"♻️ {label}Keeping {name}: not affected by the review")
+        else:
+            print(f"🔁 {label}Redoing {name}: the review changed its inputs")
+            run(name, script)
+
+
+def measure_startup(stage_list):
+    """
+    Time a fresh interpreter that only imports each stage module, i.e. the
+    fixed cost subprocess mode pays before a stage does any work.
+    """
+    costs = {}
+    for name, script in stage_list:
+        module_name = os.path.splitext(script)[0]
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", f"import {module_name}"],
+            cwd=ROOT_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        elapsed = time.perf_counter() - start
+        costs[name] = elapsed if result.returncode == 0 else None
+    return costs
+
+
+def print_stage_report(stage_times, startup_costs=None):
+    """stage_times: name -> (startup or None, run seconds)."""
+    print("\n===== STAGE TIMES =====")
+    print(f"{'stage':<32}{'startup (s)':>12}{'run (s)':>10}{'spawn+import (s)':>18}")
+    for name, (startup, run) in stage_times.items():
+        spawn = (startup_costs or {}).get(name)
+        startup_col = f"{startup:.2f}" if startup is not None else "-"
+        spawn_col = f"{spawn:.2f}" if spawn is not None else "-"
+        print(f"{name:<32}{startup_col:>12}{run:>10.2f}{spawn_col:>18}")
+
+# -----------------------------
+# Batch mode
+# -----------------------------
+def make_job_dir(job_id):
+    """Isolated working directory with its own data/ and assets/."""
+    job_dir = os.path.join(JOBS_DIR, job_id)
+    os.makedirs(os.path.join(job_dir, "data"), exist_ok=True)
+    clean_assets(job_dir)
+
+    for name in SHARED_FILES:
+        src = os.path.join(ROOT_DIR, name)
+        dst = os.path.join(job_dir, name)
+        if os.path.exists(src) and not os.path.lexists(dst):
+            os.symlink(src, dst)
+    return job_dir
+
+
+def job_env(topic):
+    env = dict(os.environ)
+    if topic:
+        env["AUTOTUBE_TOPIC"] = topic
+    else:
+        env.pop("AUTOTUBE_TOPIC", None)
+    return env
+
+
+def run_production(job_id, job_dir, env, stages=PRODUCTION_STEPS):
+    label = f"[{job_id}] "
+    start = time.perf_counter()
+    for name, script in stages:
+        run_step(name, script, cwd=job_dir, env=env, label=label)
+    return time.perf_counter() - start
+
+
+def run_production_inprocess(job, label="", stages=PRODUCTION_STEPS):
+    """Worker-process entry point: production stages for one job, in its workdir."""
+    with workdir(job.workdir):
+        for name, script in stages:
+            run_stage(name, script, job, label=label)
+    return job
+
+
+def run_production_reviewed(job, stages, mode, env=None, label=""):
+    """
+    Production lane for a job whose draft waits in the review queue. The
+    speculative stages start on the draft right away, the rest once it is
+    approved and whatever the edits invalidated has been redone.
+    """
+    start = time.perf_counter()
+    with workdir(job.workdir):
+        manifest = {}
+        run = stage_runner(job, mode, manifest, env=env, label=label, reload_text=True)
+        speculative = []
+        for name, script in stages:
+            if speculative is not None and STAGE_SPECS[script]["key"] not in SPECULATIVE_STAGES:
+                await_review(job, speculative, run, manifest, label)
+                speculative = None
+            run(name, script)
+            if speculative is not None:
+                speculative.append((name, script))
+    return job if mode == "inprocess" else time.perf_counter() - start
+
+
+def start_upload_worker():
+    """
+    Background `upload_queue.py worker` that uploads queued videos while
+    the pipeline keeps rendering. It exits once its stdin is closed and
+    nothing due is left in the queue.
+    """
+    print("\n📤 Starting upload worker")
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT_DIR, "upload_queue.py"), "worker", "--until-eof"],
+        cwd=ROOT_DIR,
+        stdin=subprocess.PIPE,
+    )
+
+
+def stop_upload_worker(proc):
+    if proc is None:
+        return
+    print("\n📤 Waiting for queued uploads to finish...")
+    proc.stdin.close()
+    proc.wait()
+
+
+def run_batch(topics, workers, review=False, mode="inprocess", queue_uploads=False, queue_reviews=False):
+    """
+    Produce one video per entry in `topics` (None = model's choice).
+    Script N+1 is generated while script N is voiced, illustrated,
+    rendered and uploaded on the worker pool. With `queue_uploads` the
+    pool only queues finished videos for the upload worker. With
+    `queue_reviews` each script goes to the review queue and the pool
+    works on it speculatively until it is approved.
+
+    In-process mode uses worker processes (stages chdir into their job
+    directory), so each worker imports the heavy stage modules only once.
+    """
+    batch_id = time.strftime("%Y%m%d-%H%M%S")
+    generation = generation_steps(review, queue_reviews)
+    production = production_steps(queue_uploads)
+    results = {}
+    start = time.perf_counter()
+
+    # The review gate hashes files relative to the job's cwd, which needs
+    # a process per worker in subprocess mode too
+    threaded = mode == "subprocess" and not queue_reviews
+    Executor = ThreadPoolExecutor if threaded else ProcessPoolExecutor
+    with Executor(max_workers=workers) as pool:
+        futures = {}
+        for i, topic in enumerate(topics):
+            job_id = f"{batch_id}_{i:03d}"
+            job_dir = make_job_dir(job_id)
+            label = f"[{job_id}] "
+
+            try:
+                job = Job(workdir=job_dir, topic=topic or "")
+                env = job_env(topic)
+                if mode == "inprocess":
+                    with workdir(job_dir):
+                        for name, script in generation:
+                            run_stage(name, script, job, label=label)
+                else:
+                    for name, script in generation:
+                        run_step(name, script, cwd=job_dir, env=env, label=label)
+
+                if queue_reviews:
+                    futures[job_id] = pool.submit(run_production_reviewed, job, production, mode, env, label)
+                elif mode == "inprocess":
+                    futures[job_id] = pool.submit(run_production_inprocess, job, label, production)
+                else:
+                    futures[job_id] = pool.submit(run_production, job_id, job_dir, env, production)
+            except StepFailed as e:
+                results[job_id] = f"failed at {e.args[0]}"
+
+        for job_id, fut in futures.items():
+            try:
+                outcome = fut.result()
+            except StepFailed as e:
+                results[job_id] = f"failed at {e.args[0]}"
+                continue
+            if isinstance(outcome, Job):
+                outcome = sum(run for _, run in outcome.stage_times.values())
+            results[job_id] = f"done in {outcome:.1f}s"
+
+    print(f"\n===== BATCH {batch_id} ({time.perf_counter() - start:.1f}s) =====")
+    for job_id, status in sorted(results.items()):
+        print(f"  {job_id}: {status}  ->  {os.path.join(JOBS_DIR, job_id)}")
+    return results
+
+
+def run_single(mode="inprocess", startup_report=False, resume=False, from_stage=None, only_stage=None,
+               queue_uploads=False, queue_reviews=False):
+    """
+    Run the whole chain once. With `resume`, a stage is skipped when its
+    inputs hash to the same key recorded after its last successful run and
+    its outputs still exist. --from-stage forces that stage and everything
+    after it; --only-stage forces just one stage. Skipped stages hand their
+    earlier outputs to the next stage. With `queue_reviews` the draft waits
+    in the review queue while the speculative stages run on it.
+    """
+    resume = resume or bool(from_stage or only_stage)
+    if not resume:
+        # A fresh run makes a new video, with its own topic index entry
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(pipeline_job.JOB_ID_PATH)
+        clean_assets()
+        manifest = {}
+        stage_cache.save_manifest(manifest)
+    else:
+        manifest = stage_cache.load_manifest()
+
+    job = Job(topic=os.environ.get("AUTOTUBE_TOPIC", ""))
+    from_index = STAGE_KEYS.index(from_stage) if from_stage else None
+    stage_times = {}
+    run = stage_runner(job, mode, manifest, reload_text=queue_reviews)
+    speculative = None      # stages run or kept while a review is pending
+
+    def redo(name, script):
+        stage_times[name] = run(name, script)
+
+    chain = pipeline_steps(queue_uploads, queue_reviews)
+    for index, (name, script) in enumerate(chain):
+        stage = STAGE_SPECS[script]["key"]
+        if speculative is not None and stage not in SPECULATIVE_STAGES:
+            await_review(job, speculative, redo, manifest)
+            speculative = None
+
+        if only_stage:
+            forced = stage == only_stage
+            skip = None if forced else f"not --only-stage {only_stage}"
+        elif from_index is not None:
+            forced = index >= from_index
+            skip = None if forced else f"before --from-stage {from_stage}"
+        else:
+            forced = False
+            skip = None
+
+        if not skip and not forced and resume and stage_cache.is_fresh(manifest, stage, stage_input_key(script)):
+            skip = "inputs unchanged since last run"
+            if speculative is not None:
+                # Still made from the draft: recheck it once the review is done
+                speculative.append((name, script))
+
+        if skip:
+            print(f"\n⏭️  Skipping {name}: {skip}")
+            # Hand the files it left last time to the next stage
+            job.load_artifacts()
+            continue
+
+        stage_times[name] = run(name, script)
+        if script == REVIEW_QUEUE_STEP[1]:
+            speculative = []
+        elif speculative is not None:
+            speculative.append((name, script))
+
+    print_stage_report(stage_times, measure_startup(chain) if startup_report else None)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the AutoTube pipeline.")
+    batch = parser.add_mutually_exclusive_group()
+    batch.add_argument("--count", type=int, help="batch mode: produce this many videos")
+    batch.add_argument("--topics", nargs="+", help="batch mode: one video per topic")
+    parser.add_argument(
+        "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+        help="videos produced in parallel in batch mode",
+    )
+    review = parser.add_mutually_exclusive_group()
+    review.add_argument(
+        "--review", action="store_true",
+        help="batch mode: stop for human review after each script",
+    )
+    review.add_argument(
+        "--review-queue", action="store_true",
+        help="queue each script for `review_queue.py approve` and keep voicing and fetching images meanwhile",
+    )
+    parser.add_argument(
+        "--mode", choices=STAGE_MODES, default="inprocess",
+        help="call stage main() in this process, or spawn one interpreter per stage",
+    )
+    parser.add_argument(
+        "--measure-startup", action="store_true",
+        help="also time a bare interpreter start + import for every stage",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="keep assets/ and skip stages whose inputs are unchanged since their last run",
+    )
+    uploads = parser.add_mutually_exclusive_group()
+    uploads.add_argument(
+        "--queue-uploads", action="store_true",
+        help="queue finished videos and upload them in a background worker while rendering continues",
+    )
+    uploads.add_argument(
+        "--enqueue-only", action="store_true",
+        help="queue finished videos for an already running `upload_queue.py worker`",
+    )
+    stage = parser.add_mutually_exclusive_group()
+    stage.add_argument("--from-stage", choices=STAGE_KEYS, help="rerun this stage and every stage after it")
+    stage.add_argument("--only-stage", choices=STAGE_KEYS, help="rerun just this stage")
+    args = parser.parse_args(argv)
+
+    # Every batch job starts in a new jobs/<id>/ folder, so there is nothing to resume
+    if args.count or args.topics:
+        for flag, value in (("--resume", args.resume), ("--from-stage", args.from_stage),
+                            ("--only-stage", args.only_stage)):
+            if value:
+                parser.error(f"{flag} only applies to a single run, not to --count/--topics")
+    return args
+
 
 if __name__ == "__main__":
-    for name, script in steps:
-        run_step(name, script)
+    args = parse_args()
+    queue_uploads = args.queue_uploads or args.enqueue_only
+    uploader = start_upload_worker() if args.queue_uploads else None
+
+    if args.count or args.topics:
+        topics = args.topics or [None] * args.count
+        try:
+            results = run_batch(
+                topics, args.workers, review=args.review, mode=args.mode,
+                queue_uploads=queue_uploads, queue_reviews=args.review_queue,
+            )
+        finally:
+            stop_upload_worker(uploader)
+        if any(not status.startswith("done") for status in results.values()):
+            sys.exit(1)
+        print("\n🎉 Batch completed successfully!")
+        sys.exit(0)
+
+    try:
+        run_single(
+            args.mode,
+            startup_report=args.measure_startup,
+            resume=args.resume,
+            from_stage=args.from_stage,
+            only_stage=args.only_stage,
+            queue_uploads=queue_uploads,
+            queue_reviews=args.review_queue,
+        )
+    except StepFailed as e:
+        sys.exit(e.args[1])
+    finally:
+        stop_upload_worker(uploader)
     print("\n🎉 Pipeline completed successfully!")
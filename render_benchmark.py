@@ -0,0 +1,81 @@
+import os
+import argparse
+
+import effects
+import video_creator_advanced as vca
+
+BENCH_DIR = os.path.join(vca.VIDEOS_DIR, "benchmark")
+
+
+def file_mb(path):
+    return os.path.getsize(path) / (1024 * 1024)
+
+
+def bench_backends(backends=vca.RENDER_BACKENDS, runs=1, profile="balanced"):
+    """Render the current data/ + assets/images input once per backend and compare."""
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    results = {}
+
+    for backend in backends:
+        out_path = os.path.join(BENCH_DIR, f"{backend}.mp4")
+        times = [vca.render(backend, out_path, profile) for _ in range(runs)]
+        results[backend] = (min(times), file_mb(out_path), vca.probe_duration(out_path))
+
+    print(f"\n===== RENDER BENCHMARK ({profile}) =====")
+    print(f"{'backend':<10}{'best (s)':>10}{'size (MB)':>12}{'length (s)':>12}")
+    for backend, (best, size, length) in results.items():
+        print(f"{backend:<10}{best:>10.2f}{size:>12.2f}{length:>12.2f}")
+
+    if "moviepy" in results and "ffmpeg" in results:
+        speedup = results["moviepy"][0] / max(results["ffmpeg"][0], 1e-9)
+        print(f"\nffmpeg backend is {speedup:.1f}x faster than moviepy")
+    return results
+
+
+def bench_effects(backend="ffmpeg", runs=1, profile="draft"):
+    """
+    Render the same input as hard cuts and with each effect (then all of
+    them) and report what every effect adds per output frame. Captions are
+    left out so only the effects are measured.
+    """
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    variants = [("static", ()), *((name, (name,)) for name in effects.EFFECTS), ("all", effects.EFFECTS)]
+    results = {}
+
+    for label, names in variants:
+        out_path = os.path.join(BENCH_DIR, f"{backend}_{label}.mp4")
+        times = [
+            vca.render(backend, out_path, profile, burn_captions=False, effects=names)
+            for _ in range(runs)
+        ]
+        frames = vca.probe_duration(out_path) * vca.FPS
+        results[label] = (min(times), min(times) / frames * 1000)
+
+    base = results["static"][1]
+    print(f"\n===== EFFECTS BENCHMARK ({backend}, {profile}) =====")
+    print(f"{'effect':<10}{'best (s)':>10}{'ms/frame':>10}{'+ms/frame':>11}{'vs static':>11}")
+    for label, (best, per_frame) in results.items():
+        print(f"{label:<10}{best:>10.2f}{per_frame:>10.2f}{per_frame - base:>11.2f}{per_frame / base:>10.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark slideshow render backends on the same input.")
+    parser.add_argument("--runs", type=int, default=1, help="renders per backend (best time is reported)")
+    parser.add_argument("--backend", action="append", choices=vca.RENDER_BACKENDS,
+                        help="limit to these backends (default: all)")
+    parser.add_argument("--profile", choices=vca.PROFILE_CHOICES, default="balanced",
+                        help="encoder profile used for every backend")
+    parser.add_argument("--effects", action="store_true",
+                        help="compare slideshow effects against hard cuts instead of backends")
+    args = parser.parse_args()
+
+    if args.effects:
+        for backend in args.backend or vca.RENDER_BACKENDS:
+            bench_effects(backend, runs=args.runs, profile=args.profile)
+        return
+    bench_backends(args.backend or vca.RENDER_BACKENDS, runs=args.runs, profile=args.profile)
+
+
+if __name__ == "__main__":
+    main()
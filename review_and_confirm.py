@@ -2,6 +2,10 @@ import os
 import subprocess
 import sys
 
+import script_caption_hashtags_ollama as generator
+import topic_index
+from pipeline_job import Job
+
 DATA_DIR = "data"
 
 FILES = {
@@ -34,16 +38,24 @@ def edit_field():
     else:
         print("Invalid choice.")
 
-def regenerate_ai():
+def regenerate_ai(topic=""):
     print("🔁 Regenerating using Ollama (script_caption_hashtags_ollama.py)...")
-    result = subprocess.run([sys.executable, "script_caption_hashtags_ollama.py"])
-    if result.returncode != 0:
-        print("❌ Regeneration failed.")
-        sys.exit(1)
+    # In-process: no new interpreter, and the model stays loaded between tries.
+    # No seed, so every regeneration samples fresh content.
+    try:
+        generator.main(Job(topic=topic), seed=None)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print("❌ Regeneration failed.")
+            sys.exit(1)
     print("✅ Regenerated. Showing new content:")
     show_content()
 
-def main():
+def main(job=None):
+    if job is not None:
+        # Review works on the files so the editor can change them
+        job.save_text()
+
     if not os.path.exists(DATA_DIR):
         print("No data/ directory yet. Run generator first.")
         sys.exit(1)
@@ -54,12 +66,14 @@ def main():
         choice = input("[c] continue  [e] edit  [r] regenerate with AI  [q] quit: ").strip().lower()
         if choice == "c":
             print("✅ Confirmed. Continuing pipeline...")
-            sys.exit(0)
+            job = (job or Job()).load_text()
+            topic_index.add_job(job)
+            return job
         elif choice == "e":
             edit_field()
             show_content()
         elif choice == "r":
-            regenerate_ai()
+            regenerate_ai(job.topic if job else os.environ.get("AUTOTUBE_TOPIC", ""))
         elif choice == "q":
             print("❌ User aborted pipeline.")
             sys.exit(1)
@@ -0,0 +1,231 @@
+import os
+import time
+import shlex
+import sqlite3
+import argparse
+import subprocess
+
+from pipeline_job import Job, DATA_DIR, TEXT_FIELDS
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# One queue for every run and batch job, next to the scripts
+DB_PATH = os.environ.get("AUTOTUBE_REVIEW_QUEUE", os.path.join(ROOT_DIR, "review_queue.sqlite"))
+REVIEW_ID_PATH = os.path.join(DATA_DIR, "review_id.txt")
+POLL_INTERVAL = 2.0
+# How long the pipeline waits for a decision, in seconds (0 = no limit)
+REVIEW_TIMEOUT = float(os.environ.get("AUTOTUBE_REVIEW_TIMEOUT", "0"))
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            workdir TEXT NOT NULL,
+            title TEXT NOT NULL,
+            note TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS reviews_status ON reviews (status, id);
+        """
+    )
+    return conn
+
+
+def get(review_id):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM reviews WHERE id = ?", (review_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row is not None else None
+
+
+def current_id():
+    """The review submitted from the current job directory, or None."""
+    try:
+        with open(REVIEW_ID_PATH) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _set_status(review_id, status, note=""):
+    """Move a pending review to `status`. False if it was no longer pending."""
+    conn = _connect()
+    try:
+        return conn.execute(
+            "UPDATE reviews SET status = ?, note = ?, updated = ? WHERE id = ? AND status = 'pending'",
+            (status, note, time.time(), review_id),
+        ).rowcount > 0
+    finally:
+        conn.close()
+
+# -----------------------------
+# Pipeline side
+# -----------------------------
+def submit(job):
+    """
+    Put the job's draft up for review without waiting for it. The reviewer
+    edits the job's own data/*.txt files, so the pipeline picks the changes
+    up with Job.load_text(). A draft still pending from an interrupted run
+    of the same job is reused rather than queued twice.
+    """
+    workdir = os.path.abspath(job.workdir)
+    review_id = current_id()
+    existing = get(review_id) if review_id else None
+    conn = _connect()
+    try:
+        now = time.time()
+        if existing and existing["status"] == "pending" and existing["workdir"] == workdir:
+            conn.execute("UPDATE reviews SET title = ?, updated = ? WHERE id = ?", (job.title, now, review_id))
+        else:
+            review_id = conn.execute(
+                "INSERT INTO reviews (created, updated, workdir, title) VALUES (?, ?, ?, ?)",
+                (now, now, workdir, job.title),
+            ).lastrowid
+    finally:
+        conn.close()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(REVIEW_ID_PATH, "w") as f:
+        f.write(str(review_id))
+    print(f"📝 Review #{review_id} queued: {job.title}")
+    print(f"   python review_queue.py approve {review_id}   (or edit / reject)")
+    return review_id
+
+
+def wait(review_id, label="", timeout=None):
+    """
+    Block until the review is approved or rejected and return its row.
+    After `timeout` seconds the review is marked expired, so it can no
+    longer be approved for a job that has stopped, and TimeoutError is raised.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    announced = False
+    while True:
+        review = get(review_id)
+        if review is None:
+            raise LookupError(f"Review #{review_id} is not in {DB_PATH}")
+        if review["status"] != "pending":
+            print(f"{'✅' if review['status'] == 'approved' else '❌'} {label}Review #{review_id} {review['status']}")
+            return review
+        if not announced:
+            print(f"\n⏳ {label}Waiting for review #{review_id}: {review['title']}")
+            announced = True
+        if deadline is not None and time.monotonic() >= deadline:
+            reason = f"not decided within {timeout:g}s"
+            if _set_status(review_id, "expired", reason):
+                raise TimeoutError(f"Review #{review_id} {reason}")
+            continue    # decided just now; pick up the decision
+        time.sleep(POLL_INTERVAL)
+
+# -----------------------------
+# Reviewer side
+# -----------------------------
+def decide(review_id, status, note=""):
+    if not _set_status(review_id, status, note):
+        review = get(review_id)
+        print(f"⚠️ Review #{review_id} is {review['status'] if review else 'not in the queue'}")
+        return False
+    print(f"{'✅' if status == 'approved' else '❌'} Review #{review_id} {status}")
+    return True
+
+
+def text_path(review, name):
+    return os.path.join(review["workdir"], DATA_DIR, f"{name}.txt")
+
+
+def show(review_id):
+    review = get(review_id)
+    if review is None:
+        print(f"⚠️ No review #{review_id}")
+        return None
+    print(f"\n===== REVIEW #{review_id} ({review['status']}) =====")
+    for name in TEXT_FIELDS:
+        path = text_path(review, name)
+        print(f"\n[{name}]")
+        print("------------------------")
+        if os.path.exists(path):
+            with open(path) as f:
+                print(f.read().strip())
+        else:
+            print("(missing)")
+    print("\n===========================\n")
+    return review
+
+
+def edit(review_id, name="script"):
+    """
+    Open one of the draft's text files in $EDITOR (nano by default). The
+    review stays pending; stages the change affects are redone on approval.
+    """
+    review = get(review_id)
+    if review is None or review["status"] != "pending":
+        print(f"⚠️ Review #{review_id} is not pending")
+        return False
+    # $EDITOR may carry arguments, e.g. "code --wait"
+    subprocess.run(shlex.split(os.environ.get("EDITOR", "nano")) + [text_path(review, name)])
+    print(f"✏️ Edited {name} of review #{review_id}; approve it to continue")
+    return True
+
+
+def list_reviews(show_all=False):
+    conn = _connect()
+    try:
+        where = "" if show_all else "WHERE status = 'pending'"
+        rows = conn.execute(f"SELECT id, status, title, workdir FROM reviews {where} ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    for review_id, status, title, workdir in rows:
+        print(f"#{review_id:<5}{status:<10}{title[:50]:<50}  {workdir}")
+    return rows
+
+
+def main(job=None):
+    """Pipeline stage: queue the draft for review and carry on without waiting."""
+    if job is not None:
+        # The reviewer edits the files, not the in-memory job
+        job.save_text()
+    else:
+        job = Job().load_artifacts()
+    submit(job)
+    return job
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Approve, edit or reject drafts waiting for review.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("submit", help="queue the draft in the current directory (default)")
+    listing = sub.add_parser("list", help="show pending reviews")
+    listing.add_argument("--all", action="store_true", help="include approved, rejected and expired ones")
+    for command in ("show", "approve"):
+        sub.add_parser(command).add_argument("id", type=int)
+    reject = sub.add_parser("reject")
+    reject.add_argument("id", type=int)
+    reject.add_argument("--note", default="", help="why it was rejected")
+    edit_cmd = sub.add_parser("edit")
+    edit_cmd.add_argument("id", type=int)
+    edit_cmd.add_argument("field", nargs="?", default="script", choices=TEXT_FIELDS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command in (None, "submit"):
+        main()
+    elif args.command == "list":
+        list_reviews(args.all)
+    elif args.command == "show":
+        show(args.id)
+    elif args.command == "approve":
+        decide(args.id, "approved")
+    elif args.command == "reject":
+        decide(args.id, "rejected", args.note)
+    else:
+        edit(args.id, args.field)
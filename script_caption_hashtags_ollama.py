@@ -3,11 +3,25 @@ import json
 import requests
 import re
 import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_cache
+import topic_index
+from pipeline_job import Job, job_id
+from text_utils import EMOJI_RE, split_sentences, count_sentences, count_words
 
 MODEL = "llama3.2:1b"
 OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
 DATA_DIR = "data"
 
+# Keep the model resident between calls (reviews, regenerations, batch jobs)
+# so Ollama can skip the model load and reuse the cached PROMPT prefix.
+KEEP_ALIVE = os.environ.get("AUTOTUBE_OLLAMA_KEEP_ALIVE", "30m")
+# Fixed seed = reproducible output; seeded responses are served from cache
+DEFAULT_SEED = int(os.environ["AUTOTUBE_SEED"]) if os.environ.get("AUTOTUBE_SEED") else None
+
 PROMPT = """
 You MUST return ONLY a valid JSON object with EXACTLY these five keys:
 "title", "description", "hashtags", "script", "image_query".
@@ -87,20 +101,132 @@ Return ONLY the JSON.
 """.strip()
 
 
-def call_ollama(prompt: str) -> str:
-    """Call Ollama and return the raw response text."""
+REQUIRED_KEYS = ("title", "description", "hashtags", "script", "image_query")
+
+# Fields handed to downstream stages as soon as they finish streaming
+PARTIAL_FIELDS = ("title", "image_query")
+
+CONNECT_TIMEOUT = 10      # seconds
+READ_TIMEOUT = 150        # seconds without a byte from Ollama
+
+
+class JsonStreamScanner:
+    """
+    Find complete top-level {...} objects in text that arrives in pieces.
+    Tracks string/escape state so braces inside values don't count.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.start = None
+        self.depth = 0
+        self.in_str = False
+        self.escape = False
+
+    def feed(self, text=""):
+        """Add text; return the next complete object's source, or None."""
+        self.buf += text
+        while self.pos < len(self.buf):
+            ch = self.buf[self.pos]
+            self.pos += 1
+            if self.start is None:
+                if ch == "{":
+                    self.start = self.pos - 1
+                    self.depth = 1
+            elif self.in_str:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_str = False
+            elif ch == '"':
+                self.in_str = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    block = self.buf[self.start:self.pos]
+                    self.start = None
+                    return block
+        return None
+
+    def completed_fields(self, names):
+        """String fields from `names` whose closing quote has already arrived."""
+        found = {}
+        for name in names:
+            m = re.search(rf'"{name}"\s*:\s*"((?:[^"\\]|\\.)*)"', self.buf)
+            if m:
+                try:
+                    found[name] = json.loads(f'"{m.group(1)}"')
+                except ValueError:
+                    found[name] = m.group(1)
+        return found
+
+
+def complete_object(block, required=REQUIRED_KEYS):
+    """Parsed dict if `block` is valid JSON with all required keys, else None."""
+    try:
+        data = json.loads(block)
+    except ValueError:
+        return None
+    if isinstance(data, dict) and all(k in data for k in required):
+        return data
+    return None
+
+
+def call_ollama(prompt: str, on_field=None, fmt=None, required=REQUIRED_KEYS,
+                seed=None, time_limit=None) -> str:
+    """
+    Stream a generation from Ollama and return the raw response text.
+
+    Generation is cut off as soon as a complete JSON object with all
+    `required` keys has arrived (closing the stream makes Ollama stop
+    generating). `on_field(name, value)` is called once for each of
+    PARTIAL_FIELDS as soon as its value is complete. `fmt="json"` turns
+    on Ollama's constrained JSON output.
+
+    With a `seed` the output is deterministic, so it is looked up in and
+    stored to the local response cache.
+
+    `time_limit` (seconds) caps the whole call: the read timeout never
+    exceeds it and streaming stops once it has passed.
+    """
+    options = {
+        "num_predict": 220,   # allow longer outputs
+        "temperature": 0.8,
+    }
+    if seed is not None:
+        options["seed"] = seed
+
+    key = prompt_hash = None
+    if seed is not None:
+        key, prompt_hash = llm_cache.request_key(MODEL, prompt, options, fmt)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            print("💾 Using cached Ollama response")
+            if on_field:
+                scanner = JsonStreamScanner()
+                scanner.feed(cached)
+                for name, value in scanner.completed_fields(PARTIAL_FIELDS).items():
+                    on_field(name, value)
+            return cached
+
     print("➡️  Calling Ollama at", OLLAMA_URL)
     payload = {
         "model": MODEL,
         "prompt": prompt,
-        "stream": False,
-        "options": {
-            "num_predict": 220,   # allow longer outputs
-            "temperature": 0.8,
-        },
+        "stream": True,
+        "keep_alive": KEEP_ALIVE,
+        "options": options,
     }
+    if fmt:
+        payload["format"] = fmt
     try:
-        resp = requests.post(OLLAMA_URL, json=payload, timeout=150)
+        read_timeout = READ_TIMEOUT if time_limit is None else max(min(READ_TIMEOUT, time_limit), 1.0)
+        resp = requests.post(OLLAMA_URL, json=payload, timeout=(CONNECT_TIMEOUT, read_timeout), stream=True)
     except requests.exceptions.RequestException as e:
         print("❌ Could not connect to Ollama.")
         print("   Is `ollama serve` running and is llama3.2:1b pulled?")
@@ -112,8 +238,50 @@ def call_ollama(prompt: str) -> str:
         print("Body:", resp.text[:400])
         sys.exit(1)
 
-    data = resp.json()
-    return data.get("response", "")
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    raw = _read_stream(resp, on_field, required, deadline)
+    if key and complete_object(raw[raw.find("{"):], required) is not None:
+        llm_cache.put(key, MODEL, prompt_hash, raw)
+    return raw
+
+
+def _read_stream(resp, on_field, required, deadline=None):
+    """Consume Ollama's NDJSON stream until a complete object, `done` or the deadline."""
+    scanner = JsonStreamScanner()
+    announced = set()
+    start = time.perf_counter()
+    try:
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            block = scanner.feed(chunk.get("response", ""))
+
+            if on_field:
+                for name, value in scanner.completed_fields(PARTIAL_FIELDS).items():
+                    if name not in announced:
+                        announced.add(name)
+                        on_field(name, value)
+
+            while block is not None:
+                if complete_object(block, required) is not None:
+                    print(f"⚡ Complete JSON after {time.perf_counter() - start:.1f}s, stopping generation")
+                    return scanner.buf[:scanner.pos]
+                block = scanner.feed()
+
+            if chunk.get("done"):
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                print("⏱️ Ollama call ran out of time, stopping generation")
+                break
+    except requests.exceptions.RequestException as e:
+        print("❌ Ollama stream broke off:", e)
+        if not scanner.buf:
+            sys.exit(1)
+    finally:
+        resp.close()
+
+    return scanner.buf
 
 import json
 import re
@@ -148,52 +316,288 @@ def extract_json(text):
         "image_query": "car engine"
     }
 
-def count_sentences(text: str) -> int:
-    parts = re.split(r"[.!?]+", text)
-    return len([p for p in parts if p.strip()])
-
+# -----------------------------
+# Content validation
+# -----------------------------
+MAX_FIX_ROUNDS = 3        # targeted regenerations before giving up
+FIX_TIME_BUDGET = 60.0    # seconds allowed for all of them together
+
+BANNED_SCRIPT_PHRASES = ("youtube", "video", "subscribe", "hi guys")
+
+# Short rule text repeated to the model when a field has to be redone
+FIELD_RULES = {
+    "title": "max 55 characters, exactly ONE emoji, no quotes, no hashtags",
+    "description": "1-2 short sentences, no emojis, no hashtags",
+    "hashtags": "5 to 12 hashtags, space-separated, no commas",
+    "script": (
+        "6 to 8 sentences, 70 to 95 words, conversational storytelling, "
+        "no emojis, no hashtags, no mention of YouTube or video, "
+        "no filler like 'hi guys' or 'subscribe', no repeated sentences"
+    ),
+    "image_query": "3-6 words about cars or engines, no emojis, no hashtags, no quotes",
+}
 
-def count_words(text: str) -> int:
-    return len(re.findall(r"\w+", text))
 
-def main():
+def as_text(value):
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value or "").strip()
+
+
+def validate_content(data):
+    """Check every PROMPT rule. Returns {field: problem} for each failing field."""
+    errors = {}
+    f = {k: as_text(data.get(k)) for k in REQUIRED_KEYS}
+
+    title = f["title"]
+    emojis = len(EMOJI_RE.findall(title))
+    if not title:
+        errors["title"] = "missing"
+    elif len(title) > 55:
+        errors["title"] = f"{len(title)} characters, max is 55"
+    elif emojis != 1:
+        errors["title"] = f"has {emojis} emojis, needs exactly one"
+    elif '"' in title or "#" in title:
+        errors["title"] = "contains quotes or hashtags"
+
+    desc = f["description"]
+    n = count_sentences(desc)
+    if not 1 <= n <= 2:
+        errors["description"] = f"{n} sentences, needs 1-2"
+    elif EMOJI_RE.search(desc) or "#" in desc:
+        errors["description"] = "contains emojis or hashtags"
+
+    tags = f["hashtags"]
+    n = len([t for t in tags.split() if t.startswith("#")])
+    if "," in tags:
+        errors["hashtags"] = "comma-separated, must be space-separated"
+    elif not 5 <= n <= 12:
+        errors["hashtags"] = f"{n} hashtags, needs 5-12"
+
+    script = f["script"]
+    words, sentences = count_words(script), count_sentences(script)
+    lowered = script.lower()
+    parts = [p.rstrip(".!?").lower() for p in split_sentences(script)]
+    if not 70 <= words <= 95:
+        errors["script"] = f"{words} words, needs 70-95"
+    elif not 6 <= sentences <= 8:
+        errors["script"] = f"{sentences} sentences, needs 6-8"
+    elif EMOJI_RE.search(script) or "#" in script:
+        errors["script"] = "contains emojis or hashtags"
+    elif any(p in lowered for p in BANNED_SCRIPT_PHRASES):
+        errors["script"] = "mentions YouTube/video or uses filler lines"
+    elif len(set(parts)) != len(parts):
+        errors["script"] = "repeats a sentence"
+
+    iq = f["image_query"]
+    n = count_words(iq)
+    if not 3 <= n <= 6:
+        errors["image_query"] = f"{n} words, needs 3-6"
+    elif EMOJI_RE.search(iq) or "#" in iq or '"' in iq:
+        errors["image_query"] = "contains emojis, hashtags or quotes"
+
+    return errors
+
+
+def check_content(data):
+    """Rule validation plus a lookup for near-duplicates of earlier videos."""
+    errors = validate_content(data)
+    if "script" not in errors:
+        dup = topic_index.find_duplicate(
+            as_text(data.get("title")), as_text(data.get("script")), as_text(data.get("image_query")),
+            exclude_key=job_id(),
+        )
+        if dup:
+            old_title, sim = dup
+            problem = f"repeats an earlier video ({old_title!r}, {sim:.0%} similar), pick a different car fact"
+            for k in ("title", "script", "image_query"):
+                errors.setdefault(k, problem)
+    return errors
+
+
+def build_fix_prompt(data, errors):
+    """Ask for replacements of only the failing fields, with their rules."""
+    current = {k: as_text(data.get(k)) for k in REQUIRED_KEYS}
+    problems = "\n".join(
+        f'- "{k}": {problem}. Rules: {FIELD_RULES[k]}.' for k, problem in errors.items()
+    )
+    keys = ", ".join(f'"{k}"' for k in errors)
+    return (
+        "Here is a JSON object for a short car-fact narration:\n"
+        f"{json.dumps(current, ensure_ascii=False, indent=2)}\n\n"
+        f"These fields break the rules:\n{problems}\n\n"
+        f"Return ONLY a JSON object with exactly these keys: {keys}. "
+        "Rewrite them to follow the rules and stay consistent with the other fields."
+    )
+
+
+def fix_content(data, errors, max_rounds=MAX_FIX_ROUNDS, time_budget=FIX_TIME_BUDGET,
+                seed=None):
+    """
+    Regenerate only the failing fields in Ollama's JSON mode until every
+    rule passes or the retry/time budget runs out. Returns (data, errors).
+    """
+    start = time.perf_counter()
+    for round_no in range(1, max_rounds + 1):
+        if not errors:
+            break
+        remaining = time_budget - (time.perf_counter() - start)
+        if remaining <= 0:
+            print(f"⏱️ Fix budget of {time_budget:.0f}s used up")
+            break
+
+        print(f"🔧 Fix round {round_no}: regenerating {', '.join(errors)}")
+        for k, problem in errors.items():
+            print(f"   - {k}: {problem}")
+
+        raw = call_ollama(
+            build_fix_prompt(data, errors), fmt="json", required=tuple(errors),
+            seed=None if seed is None else seed + round_no,
+            time_limit=remaining,
+        )
+        # Only the failing fields are merged, and only from a real answer:
+        # extract_json's placeholders must never replace anything
+        block = JsonStreamScanner().feed(raw)
+        fixed = complete_object(block, required=tuple(errors)) if block else None
+        if fixed is None:
+            print("⚠️ Fix round returned no usable JSON")
+            continue
+        for k in errors:
+            data[k] = fixed[k]
+        errors = check_content(data)
+
+    return data, errors
+
+# -----------------------------
+# Candidate scoring
+# -----------------------------
+# Candidates are sampled in parallel; Ollama serves them concurrently up to
+# its OLLAMA_NUM_PARALLEL slots, so K candidates cost about one call.
+DEFAULT_CANDIDATES = int(os.environ.get("AUTOTUBE_CANDIDATES", "1"))
+DUPLICATE_SIMILARITY = 0.8   # word-set Jaccard above which scripts count as the same
+
+
+def word_set(text):
+    return set(re.findall(r"\w+", as_text(text).lower()))
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def score_candidate(data):
+    """
+    Lower is better. Each broken rule costs 100; within the rules, prefer
+    scripts near the middle of the word/sentence ranges and hashtag counts
+    near the middle of 5-12.
+    """
+    errors = check_content(data)
+    penalty = 100 * len(errors)
+
+    script = as_text(data.get("script"))
+    penalty += abs(count_words(script) - 82) / 13
+    penalty += abs(count_sentences(script) - 7)
+    penalty += abs(len(as_text(data.get("hashtags")).split()) - 8) / 4
+    if len(as_text(data.get("title"))) > 55:
+        penalty += 1
+    return penalty, errors
+
+
+def pick_best(candidates):
+    """Drop near-duplicate candidates, score the rest and return the best one."""
+    unique = []
+    for data in candidates:
+        words = word_set(data.get("script"))
+        if any(jaccard(words, word_set(u.get("script"))) >= DUPLICATE_SIMILARITY for u in unique):
+            continue
+        unique.append(data)
+
+    scored = [(score_candidate(d), i, d) for i, d in enumerate(unique)]
+    scored.sort(key=lambda item: (item[0][0], item[1]))
+
+    print(f"\n🏁 {len(candidates)} candidates, {len(unique)} unique:")
+    for (penalty, errors), i, d in scored:
+        print(f"   #{i}: penalty {penalty:6.1f}  fails: {', '.join(errors) or '-'}  | {as_text(d.get('title'))}")
+
+    return scored[0][2]
+
+
+def generate_candidates(prompt, k, seed=None):
+    """Request `k` generations at once and return their parsed JSON objects."""
+    start = time.perf_counter()
+    seeds = [None if seed is None else seed + i for i in range(k)]
+    with ThreadPoolExecutor(max_workers=k) as pool:
+        raws = list(pool.map(lambda sd: call_ollama(prompt, seed=sd), seeds))
+    print(f"⏱️ {k} candidates in {time.perf_counter() - start:.1f}s")
+    return [extract_json(raw) for raw in raws]
+
+def build_prompt(topic=None):
+    """Base prompt, optionally pinned to a topic (set per job in batch mode)."""
+    if not topic:
+        return PROMPT
+    return f"{PROMPT}\n\nThe topic for this one MUST be: {topic}"
+
+def main(job=None, candidates=DEFAULT_CANDIDATES, seed=DEFAULT_SEED):
     print("🚀 script_caption_hashtags_ollama.py STARTED")
     print("🤖 Asking Ollama (1B) for car content...")
 
-    raw = call_ollama(PROMPT)
+    if job is None:
+        job = Job(topic=os.environ.get("AUTOTUBE_TOPIC", ""))
 
-    print("\n📝 Raw AI Output:")
-    print(raw)
+    topic = job.topic.strip()
+    if topic:
+        print("🎯 Topic:", topic)
 
-    try:
-        data = extract_json(raw)
-    except Exception as e:
-        print("❌ JSON extraction error")
-        print("Raw output from model:\n", raw)
-        raise e
-
-    title = data.get("title", "").strip()
-    description = data.get("description", "").strip()
-    hashtags = data.get("hashtags", "").strip()
-    script = data.get("script", "").strip()
-    image_query = data.get("image_query", "").strip()
-
-    os.makedirs(DATA_DIR, exist_ok=True)
-
-    with open(os.path.join(DATA_DIR, "title.txt"), "w") as f:
-        f.write(title)
-    with open(os.path.join(DATA_DIR, "description.txt"), "w") as f:
-        f.write(description)
-    with open(os.path.join(DATA_DIR, "hashtags.txt"), "w") as f:
-        f.write(hashtags)
-    with open(os.path.join(DATA_DIR, "script.txt"), "w") as f:
-        f.write(script)
-    with open(os.path.join(DATA_DIR, "image_query.txt"), "w") as f:
-        f.write(image_query)
+    def publish_early(name, value):
+        # Only on the job in memory: data/*.txt are written after validation,
+        # so --resume and the review queue never see an unchecked draft
+        setattr(job, name, value.strip())
+        print(f"⚡ {name} ready: {value.strip()}")
+
+    if candidates > 1:
+        data = pick_best(generate_candidates(build_prompt(topic), candidates, seed))
+    else:
+        raw = call_ollama(build_prompt(topic), on_field=publish_early, seed=seed)
+
+        print("\n📝 Raw AI Output:")
+        print(raw)
+
+        try:
+            data = extract_json(raw)
+        except Exception as e:
+            print("❌ JSON extraction error")
+            print("Raw output from model:\n", raw)
+            raise e
+
+    errors = check_content(data)
+    if errors:
+        data, errors = fix_content(data, errors, seed=seed)
+    if errors:
+        print("❌ Content rejected, still breaking the rules:")
+        for k, problem in errors.items():
+            print(f"   - {k}: {problem}")
+        sys.exit(1)
+    print("✅ Content passed validation")
+
+    job.set_text(**{k: as_text(data.get(k)) for k in REQUIRED_KEYS})
+    job.save_text()
 
     print("\n✅ AI Content Generated Successfully!")
-    print("Title:", title)
-    print("Image query:", image_query)
+    print("Title:", job.title)
+    print("Image query:", job.image_query)
+    return job
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate script, title and hashtags with Ollama.")
+    parser.add_argument(
+        "--candidates", type=int, default=DEFAULT_CANDIDATES,
+        help="sample this many candidates concurrently and keep the best one",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=DEFAULT_SEED,
+        help="fixed sampling seed for reproducible reruns (served from the response cache)",
+    )
+    args = parser.parse_args()
+    main(candidates=max(1, args.candidates), seed=args.seed)
@@ -0,0 +1,55 @@
+import os
+import json
+import time
+import hashlib
+
+import media_cache
+
+MANIFEST_PATH = os.path.join("data", "stage_manifest.json")
+
+
+def input_key(script_path, inputs, params=None):
+    """
+    Hash of everything a stage depends on: its own source, the content of
+    its input files and any extra parameters (topic, render settings...).
+    """
+    h = hashlib.sha256()
+    h.update(media_cache.file_sha256(script_path).encode())
+    for path in sorted(inputs):
+        h.update(path.encode())
+        h.update(media_cache.file_sha256(path).encode() if os.path.exists(path) else b"missing")
+    h.update(json.dumps(params or {}, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(manifest, stage, key):
+    """True if `stage` last finished with the same inputs and its outputs still exist."""
+    entry = manifest.get(stage)
+    if not entry or entry.get("key") != key:
+        return False
+    return all(os.path.exists(p) for p in entry.get("outputs", []))
+
+
+def record(manifest, stage, key, outputs, path=MANIFEST_PATH):
+    manifest[stage] = {
+        "key": key,
+        "outputs": list(outputs),
+        "finished": time.time(),
+    }
+    save_manifest(manifest, path)
@@ -0,0 +1,26 @@
+from text_utils import count_sentences, split_sentences, strip_emoji
+
+
+def test_split_keeps_closing_punctuation():
+    assert split_sentences("It roars. Does it fly? Yes!") == ["It roars.", "Does it fly?", "Yes!"]
+
+
+def test_split_keeps_decimals_in_one_sentence():
+    assert split_sentences("It has 3.5 liters.") == ["It has 3.5 liters."]
+    assert split_sentences("Zero to sixty takes 2.5 seconds. Then it shifts.") == [
+        "Zero to sixty takes 2.5 seconds.",
+        "Then it shifts.",
+    ]
+
+
+def test_split_after_a_number_ending_a_sentence():
+    assert split_sentences("It won in 1967. Then it retired.") == ["It won in 1967.", "Then it retired."]
+
+
+def test_count_ignores_stray_punctuation():
+    assert count_sentences("Fast... Really fast!!") == 2
+    assert count_sentences("") == 0
+
+
+def test_strip_emoji_collapses_spaces():
+    assert strip_emoji("🏎️ Rotary 🔥 Engine") == "Rotary Engine"
@@ -0,0 +1,16 @@
+from timeline import build, durations
+
+
+def test_even_split_without_timings():
+    segments = build(10, 30.0, None)
+    assert len(segments) == 10
+    assert durations(segments) == [3.0] * 10
+    assert segments[-1]["end"] == 30.0
+
+
+def test_leftover_cuts_split_stretches_in_proportion():
+    # One sentence end at 10s leaves 10s and 20s stretches for five more cuts
+    timings = {"sentences": [{"end": 10.0}, {"end": 30.0}], "words": []}
+    segments = build(6, 30.0, timings)
+    assert [s["start"] for s in segments] == [0.0, 5.0, 10.0, 15.0, 20.0, 25.0]
+    assert durations(segments) == [5.0] * 6
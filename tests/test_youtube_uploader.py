@@ -0,0 +1,129 @@
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import youtube_uploader
+
+MB = 1024 * 1024
+
+
+class FakeMedia:
+    def __init__(self, size, chunk):
+        self._size = size
+        self._chunk = chunk
+
+    def size(self):
+        return self._size
+
+    def chunksize(self):
+        return self._chunk
+
+
+class FakeHttp:
+    """Answers the empty "how much do you have" PUT with a fixed Range."""
+
+    def __init__(self, received):
+        self.received = received
+        self.queries = 0
+
+    def request(self, uri, method, headers=None, body=None):
+        self.queries += 1
+        assert method == "PUT" and headers["Content-Length"] == "0"
+        return httplib2.Response({"status": 308, "range": f"bytes=0-{self.received - 1}"}), b""
+
+
+class FakeRequest:
+    """next_chunk() plays back `script`: byte offsets, exceptions or a final dict."""
+
+    def __init__(self, script, size=3 * MB, chunk=MB, received=MB):
+        self.resumable = FakeMedia(size, chunk)
+        self.resumable_uri = None
+        self.resumable_progress = 0
+        self.http = FakeHttp(received)
+        self.script = list(script)
+
+    def postproc(self, resp, content):
+        return {"id": "from-sync"}
+
+    def next_chunk(self):
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        self.resumable_uri = "https://upload.example/session/1"
+        if isinstance(step, dict):
+            return None, step
+        self.resumable_progress = step
+        return object(), None
+
+
+def http_error(status, **headers):
+    return HttpError(httplib2.Response({"status": status, **headers}), b"")
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(youtube_uploader.time, "sleep", lambda seconds: None)
+
+
+def test_progress_then_5xx_then_response(tmp_path):
+    session_path = str(tmp_path / "session.json")
+    request = FakeRequest([MB, http_error(503), 2 * MB, {"id": "abc"}])
+
+    response = youtube_uploader.resumable_upload(request, "key", session_path)
+
+    assert response == {"id": "abc"}
+    # After the 5xx the server was asked for its offset once, then the upload went on
+    assert request.http.queries == 1
+    assert request.script == []
+    assert not (tmp_path / "session.json").exists()
+
+
+def test_5xx_with_range_skips_the_offset_query(tmp_path):
+    offsets = []
+    request = FakeRequest([MB, http_error(503, range=f"bytes=0-{2 * MB - 1}"), {"id": "abc"}])
+    original = request.next_chunk
+
+    def next_chunk():
+        offsets.append(request.resumable_progress)
+        return original()
+
+    request.next_chunk = next_chunk
+
+    assert youtube_uploader.resumable_upload(request, "key", str(tmp_path / "s.json")) == {"id": "abc"}
+    assert request.http.queries == 0
+    assert offsets[-1] == 2 * MB
+
+
+def test_resumes_saved_session_from_server_offset(tmp_path):
+    session_path = str(tmp_path / "session.json")
+    youtube_uploader.save_session("key", "https://upload.example/session/1", session_path)
+    request = FakeRequest([3 * MB - 1, {"id": "abc"}], received=2 * MB)
+    offsets = []
+    original = request.next_chunk
+
+    def next_chunk():
+        offsets.append(request.resumable_progress)
+        return original()
+
+    request.next_chunk = next_chunk
+
+    assert youtube_uploader.resumable_upload(request, "key", session_path) == {"id": "abc"}
+    assert request.http.queries == 1
+    assert offsets[0] == 2 * MB
+
+
+def test_gives_up_after_max_retries(tmp_path):
+    request = FakeRequest([http_error(500)] * 3)
+    with pytest.raises(RuntimeError):
+        youtube_uploader.resumable_upload(request, "key", str(tmp_path / "s.json"), max_retries=2)
+
+
+def test_non_retriable_error_is_raised(tmp_path):
+    request = FakeRequest([http_error(403)])
+    with pytest.raises(HttpError):
+        youtube_uploader.resumable_upload(request, "key", str(tmp_path / "s.json"))
+
+
+def test_chunk_bytes_rounds_to_256k():
+    assert youtube_uploader.chunk_bytes(1) == MB
+    assert youtube_uploader.chunk_bytes(0.1) == 256 * 1024
@@ -0,0 +1,28 @@
+import re
+
+# A sentence runs up to . ! or ?, except a period between two digits
+# ("3.5 liters", "2.5 seconds"), which is part of a number
+SENTENCE_RE = re.compile(r"(?:[^.!?]|(?<=\d)\.(?=\d))+[.!?]*")
+
+EMOJI_RE = re.compile(
+    "[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\u2300-\u23FF]"
+)
+
+
+def split_sentences(text: str) -> list:
+    """Sentences with their closing punctuation, split on . ! ?"""
+    return [p.strip() for p in SENTENCE_RE.findall(text) if p.strip(" .!?\n\t")]
+
+
+def count_sentences(text: str) -> int:
+    return len(split_sentences(text))
+
+
+def count_words(text: str) -> int:
+    return len(re.findall(r"\w+", text))
+
+
+def strip_emoji(text: str) -> str:
+    """The text without emoji, with the spaces they leave behind collapsed."""
+    # Also the variation selectors and joiners that emoji sequences leave behind
+    return " ".join(re.sub("[\uFE0E\uFE0F\u200D]", "", EMOJI_RE.sub("", text)).split())
@@ -0,0 +1,185 @@
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from pipeline_job import Job, THUMBNAIL_PATH, image_files
+from text_utils import strip_emoji
+
+# YouTube's recommended thumbnail size and its upload limit
+THUMB_WIDTH = 1280
+THUMB_HEIGHT = 720
+MAX_BYTES = 2 * 1024 * 1024
+
+SCORE_SIZE = 256            # images are scored on a downscaled grayscale copy
+MAX_LINES = 3
+FONT_SIZES = range(120, 47, -8)
+MARGIN = 60
+FONT_PATH = os.environ.get("AUTOTUBE_THUMBNAIL_FONT", "")
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+    "/Library/Fonts/Arial Bold.ttf",
+    "C:/Windows/Fonts/arialbd.ttf",
+)
+
+# -----------------------------
+# Pick the best image
+# -----------------------------
+def load_gray(path):
+    with Image.open(path) as im:
+        im.draft("L", (SCORE_SIZE, SCORE_SIZE))     # JPEG decodes at reduced size
+        im = ImageOps.exif_transpose(im).convert("L")
+        im.thumbnail((SCORE_SIZE, SCORE_SIZE))
+        return np.asarray(im, dtype=np.float32)
+
+
+def score_image(gray):
+    """
+    Sharpness (variance of the Laplacian) times RMS contrast, penalized
+    for very dark or blown-out images. Whole-array NumPy, no pixel loops.
+    """
+    lap = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4 * gray[1:-1, 1:-1]
+    )
+    sharpness = lap.var()
+    contrast = gray.std()
+    exposure = 1.0 - abs(gray.mean() - 128.0) / 128.0
+    return float(np.sqrt(sharpness) * contrast * (0.5 + exposure))
+
+
+def pick_best(paths):
+    scores = []
+    for path in paths:
+        try:
+            scores.append(score_image(load_gray(path)))
+        except OSError:
+            scores.append(-1.0)
+    best = int(np.argmax(scores))
+    return paths[best], scores[best]
+
+# -----------------------------
+# Title text
+# -----------------------------
+@lru_cache(maxsize=None)
+def font_path():
+    for path in (FONT_PATH, *FONT_CANDIDATES):
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=32)
+def load_font(size):
+    path = font_path()
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 only has the small fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def wrap(words, font, max_width):
+    lines, line = [], ""
+    for word in words:
+        candidate = f"{line} {word}".strip()
+        if line and font.getlength(candidate) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+@lru_cache(maxsize=128)
+def layout(title, width=THUMB_WIDTH, height=THUMB_HEIGHT):
+    """
+    Largest font size at which the title fits in MAX_LINES lines, as
+    (size, lines, line height). Cached, so re-renders skip the text fitting.
+    Emoji are dropped: the title fonts have no glyphs for them.
+    """
+    words = strip_emoji(title).upper().split()
+    max_width = width - 2 * MARGIN
+    for size in FONT_SIZES:
+        font = load_font(size)
+        lines = wrap(words, font, max_width)
+        widest = max((font.getlength(line) for line in lines), default=0)
+        line_height = int(size * 1.15)
+        if len(lines) <= MAX_LINES and widest <= max_width and line_height * len(lines) <= height // 2:
+            return size, tuple(lines), line_height
+    size = FONT_SIZES[-1]
+    return size, tuple(wrap(words, load_font(size), max_width)[:MAX_LINES]), int(size * 1.15)
+
+
+@lru_cache(maxsize=4)
+def shade(width=THUMB_WIDTH, height=THUMB_HEIGHT):
+    """Black-to-transparent gradient over the bottom half, for readable text."""
+    ramp = np.clip((np.arange(height) - height * 0.4) / (height * 0.6), 0, 1) ** 1.5
+    alpha = np.repeat((ramp * 200).astype(np.uint8)[:, None], width, axis=1)
+    overlay = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    overlay.putalpha(Image.fromarray(alpha))
+    return overlay
+
+
+def render_thumbnail(image_path, title):
+    with Image.open(image_path) as im:
+        im.draft("RGB", (THUMB_WIDTH, THUMB_HEIGHT))
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        frame = ImageOps.fit(im, (THUMB_WIDTH, THUMB_HEIGHT), Image.LANCZOS).convert("RGBA")
+
+    frame.alpha_composite(shade())
+    draw = ImageDraw.Draw(frame)
+    size, lines, line_height = layout(title)
+    font = load_font(size)
+    y = THUMB_HEIGHT - MARGIN - line_height * len(lines)
+    for line in lines:
+        draw.text(
+            (MARGIN, y), line, font=font, fill=(255, 255, 255),
+            stroke_width=max(2, size // 20), stroke_fill=(0, 0, 0),
+        )
+        y += line_height
+    return frame.convert("RGB")
+
+
+def save_within_limit(image, out_path, max_bytes=MAX_BYTES):
+    """JPEG at the highest quality that stays under YouTube's size limit."""
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    for quality in (92, 85, 75, 65, 50):
+        image.save(tmp_path, "JPEG", quality=quality, optimize=True)
+        if os.path.getsize(tmp_path) <= max_bytes:
+            break
+    os.replace(tmp_path, out_path)
+    return out_path
+
+# -----------------------------
+# Main
+# -----------------------------
+def main(job=None):
+    start = time.perf_counter()
+    if job is None:
+        job = Job().load_artifacts()
+
+    images = job.image_paths or image_files()
+    if not images:
+        raise FileNotFoundError("No images found in assets/images. Run image_downloader.py first.")
+
+    best, score = pick_best(images)
+    thumb = render_thumbnail(best, job.title)
+    save_within_limit(thumb, THUMBNAIL_PATH)
+
+    print(f"🖼 Thumbnail from {os.path.basename(best)} (score {score:.0f}) in {time.perf_counter() - start:.2f}s")
+    print(f"✅ Thumbnail saved: {THUMBNAIL_PATH}")
+    job.thumbnail_path = THUMBNAIL_PATH
+    return job
+
+
+if __name__ == "__main__":
+    main()
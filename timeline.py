@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+
+import media_cache
+from pipeline_job import TIMINGS_PATH, TIMELINE_PATH
+
+MIN_SEGMENT = 1.0   # seconds; never show an image for less than this
+
+
+def cut_candidates(timings, scale=1.0):
+    """
+    Times where a cut doesn't land mid-word: sentence ends first, then the
+    pauses between words for when there are more images than sentences.
+    """
+    if not timings:
+        return [], []
+    sentences = [s["end"] * scale for s in timings.get("sentences", [])[:-1]]
+    words = timings.get("words", [])
+    gaps = [(a[1] + b[0]) / 2 * scale for a, b in zip(words, words[1:])]
+    return sentences, gaps
+
+
+def _pick_cuts(n_cuts, duration, candidates, fixed=()):
+    """Choose `n_cuts` times from `candidates`, as close to an even split as possible."""
+    cuts = sorted(fixed)
+    pool = sorted(set(candidates) - set(cuts))
+    while len(cuts) < n_cuts and pool:
+        # Fill the longest remaining stretch, at the candidate nearest its middle
+        bounds = [0.0, *cuts, duration]
+        a, b = max(zip(bounds, bounds[1:]), key=lambda ab: ab[1] - ab[0])
+        usable = [t for t in pool if a + MIN_SEGMENT <= t <= b - MIN_SEGMENT]
+        if not usable:
+            break
+        best = min(usable, key=lambda t: abs(t - (a + b) / 2))
+        cuts.append(best)
+        pool.remove(best)
+        cuts.sort()
+    return cuts
+
+
+def _split_evenly(n_cuts, duration, cuts):
+    """
+    Not enough narration boundaries: divide each stretch between the cuts
+    into equal parts, more parts for longer stretches, up to `n_cuts`.
+    With no cuts at all that is a plain even split.
+    """
+    bounds = [0.0, *cuts, duration]
+    spans = list(zip(bounds, bounds[1:]))
+    parts = [1] * len(spans)
+    for _ in range(n_cuts - len(cuts)):
+        # The stretch whose parts are currently longest gets one more
+        i = max(range(len(spans)), key=lambda i: (spans[i][1] - spans[i][0]) / parts[i])
+        parts[i] += 1
+    extra = [a + (b - a) * k / n for (a, b), n in zip(spans, parts) for k in range(1, n)]
+    return sorted([*cuts, *extra])
+
+
+def build(n_images, duration, timings=None, scale=1.0):
+    """
+    Timeline of one segment per image, {"image": index, "start", "end"} in
+    seconds of the finished video. Cuts land on sentence boundaries where
+    possible, then on pauses between words, and only split evenly when the
+    narration offers nothing better.
+    """
+    if n_images <= 0:
+        return []
+    n_cuts = n_images - 1
+    sentences, gaps = cut_candidates(timings, scale)
+
+    if len(sentences) > n_cuts:
+        cuts = _pick_cuts(n_cuts, duration, sentences)
+    else:
+        cuts = [t for t in sentences if MIN_SEGMENT <= t <= duration - MIN_SEGMENT]
+        cuts = _pick_cuts(n_cuts, duration, gaps, fixed=cuts)
+
+    if len(cuts) < n_cuts:
+        cuts = _split_evenly(n_cuts, duration, cuts)
+
+    bounds = [0.0, *cuts, duration]
+    return [
+        {"image": i, "start": round(a, 3), "end": round(b, 3)}
+        for i, (a, b) in enumerate(zip(bounds, bounds[1:]))
+    ]
+
+
+def durations(segments):
+    return [s["end"] - s["start"] for s in segments]
+
+
+def load_or_build(n_images, duration, scale=1.0, timings_path=TIMINGS_PATH, path=TIMELINE_PATH):
+    """
+    The timeline for these inputs, reused from `path` when the word timings,
+    image count and length are unchanged. Every render backend reads the same
+    segments, so the timing logic runs once per input.
+    """
+    timings_hash = media_cache.file_sha256(timings_path) if os.path.exists(timings_path) else ""
+    key = hashlib.sha256(
+        json.dumps([timings_hash, n_images, round(duration, 3), scale]).encode()
+    ).hexdigest()
+
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached["segments"]
+    except (OSError, ValueError):
+        pass
+
+    timings = None
+    if timings_hash:
+        with open(timings_path) as f:
+            timings = json.load(f)
+    segments = build(n_images, duration, timings, scale)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "segments": segments}, f, indent=1)
+    os.replace(tmp_path, path)
+    return segments
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import array
+import random
+import sqlite3
+import hashlib
+
+from pipeline_job import job_id
+
+# Lives next to the scripts so every run and batch job shares one history
+DB_PATH = os.environ.get(
+    "AUTOTUBE_TOPIC_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "topic_index.sqlite"),
+)
+
+SHINGLE_SIZE = 2          # words per shingle
+NUM_PERM = 64             # MinHash signature length
+BANDS = 16                # LSH bands of NUM_PERM // BANDS rows each
+ROWS = NUM_PERM // BANDS
+DUPLICATE_THRESHOLD = 0.5 # estimated Jaccard at which content counts as a repeat
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for",
+    "with", "is", "was", "it", "its", "this", "that", "as", "by", "from", "be",
+}
+
+
+def shingles(text):
+    words = [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def signature(text):
+    """MinHash signature of the text's word shingles."""
+    hashes = [_hash64(s) for s in shingles(text)]
+    if not hashes:
+        return [0] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+
+def band_buckets(sig):
+    return [
+        (band, _hash64(",".join(map(str, sig[band * ROWS:(band + 1) * ROWS]))) >> 1)
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig_a, sig_b):
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def document_text(title, script, image_query):
+    return f"{title} {script} {image_query}"
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS docs (
+            id INTEGER PRIMARY KEY,
+            created REAL NOT NULL,
+            title TEXT NOT NULL,
+            image_query TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            job_key TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE IF NOT EXISTS buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            doc_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+        """
+    )
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(docs)")]
+    if "job_key" not in columns:
+        # Index created before entries were tied to their job
+        conn.execute("ALTER TABLE docs ADD COLUMN job_key TEXT NOT NULL DEFAULT ''")
+    conn.execute("CREATE INDEX IF NOT EXISTS docs_job ON docs (job_key)")
+    return conn
+
+
+def find_duplicate(title, script, image_query, threshold=DUPLICATE_THRESHOLD, exclude_key=""):
+    """
+    Most similar earlier video if its estimated similarity reaches
+    `threshold`, as (title, similarity); otherwise None. Only documents
+    that share an LSH bucket are compared, so lookups stay fast with tens
+    of thousands of entries. The entry added by job `exclude_key` is
+    ignored, so re-checking a job never matches itself.
+    """
+    if not os.path.exists(DB_PATH):
+        return None
+
+    sig = signature(document_text(title, script, image_query))
+    conn = _connect()
+    try:
+        ids = set()
+        for band, bucket in band_buckets(sig):
+            rows = conn.execute(
+                "SELECT doc_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            )
+            ids.update(r[0] for r in rows)
+
+        best = None
+        for doc_id in ids:
+            old_title, blob, key = conn.execute(
+                "SELECT title, signature, job_key FROM docs WHERE id = ?", (doc_id,)
+            ).fetchone()
+            if exclude_key and key == exclude_key:
+                continue
+            sim = similarity(sig, array.array("Q", blob))
+            if sim >= threshold and (best is None or sim > best[1]):
+                best = (old_title, sim)
+        return best
+    finally:
+        conn.close()
+
+
+def add(title, script, image_query, job_key=""):
+    """Index a video. With a `job_key`, replaces whatever that job indexed before."""
+    sig = signature(document_text(title, script, image_query))
+    conn = _connect()
+    try:
+        with conn:
+            if job_key:
+                old = [r[0] for r in conn.execute("SELECT id FROM docs WHERE job_key = ?", (job_key,))]
+                conn.executemany("DELETE FROM buckets WHERE doc_id = ?", [(i,) for i in old])
+                conn.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in old])
+            cur = conn.execute(
+                "INSERT INTO docs (created, title, image_query, signature, job_key) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), title, image_query, array.array("Q", sig).tobytes(), job_key),
+            )
+            conn.executemany(
+                "INSERT INTO buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                [(band, bucket, cur.lastrowid) for band, bucket in band_buckets(sig)],
+            )
+    finally:
+        conn.close()
+
+
+def add_job(job):
+    """
+    Index a job once its script is approved or its video uploaded (run in
+    the job's directory). Drafts are never indexed, so rejected or
+    regenerated scripts don't count as earlier videos.
+    """
+    add(job.title, job.script, job.image_query, job_key=job_id())
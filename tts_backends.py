@@ -0,0 +1,190 @@
+import io
+import os
+import re
+import shutil
+import asyncio
+import tempfile
+import subprocess
+import wave
+from abc import ABC, abstractmethod
+
+import edge_tts
+
+TICKS_PER_SECOND = 10_000_000   # edge-tts boundary offsets are in 100ns units
+EDGE_BITRATE = 48_000           # audio-24khz-48kbitrate-mono-mp3, constant bitrate
+
+
+class TTSBackend(ABC):
+    """
+    One text-to-speech engine. `synthesize` returns the audio for one chunk
+    of text and its word timings as [start, end, word] in seconds, or None
+    if the engine doesn't report them. `container` says how chunks are
+    joined: "mp3" chunks are concatenated byte for byte, "wav" chunks are
+    joined as PCM and encoded to MP3 once at the end.
+    """
+    name = ""
+    container = "mp3"
+
+    def __init__(self, voice, rate):
+        self.voice = voice
+        self.rate = rate
+
+    def available(self):
+        return True
+
+    def cache_tag(self):
+        """Everything besides the text that changes the audio."""
+        return f"{self.name}\0{self.voice}\0{self.rate}"
+
+    @abstractmethod
+    async def synthesize(self, text):
+        """(audio bytes, words or None) for one chunk of text."""
+
+    async def _run(self, cmd, stdin=None):
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.PIPE if stdin is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            out, err = await proc.communicate(stdin)
+        except asyncio.CancelledError:
+            proc.kill()
+            raise
+        if proc.returncode != 0:
+            raise RuntimeError(f"{cmd[0]} failed: {err.decode(errors='ignore')[:300]}")
+        return out
+
+
+class EdgeBackend(TTSBackend):
+    """Microsoft Edge online voices (needs network)."""
+    name = "edge"
+    container = "mp3"
+
+    def _communicate(self, text):
+        try:
+            return edge_tts.Communicate(
+                text, voice=self.voice, rate=self.rate, boundary="WordBoundary"
+            )
+        except TypeError:
+            # Older edge-tts always sends word boundaries and has no option
+            return edge_tts.Communicate(text, voice=self.voice, rate=self.rate)
+
+    async def synthesize(self, text):
+        # Audio and word boundaries come interleaved on the same stream
+        audio = bytearray()
+        words = []
+        async for chunk in self._communicate(text).stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                start = chunk["offset"] / TICKS_PER_SECOND
+                end = (chunk["offset"] + chunk["duration"]) / TICKS_PER_SECOND
+                words.append([round(start, 3), round(end, 3), chunk["text"]])
+        return bytes(audio), words or None
+
+
+def rate_to_wpm(rate, base=175):
+    """Edge-style "+10%" rate to an espeak words-per-minute speed."""
+    m = re.fullmatch(r"([+-]\d+)%", rate.strip())
+    pct = int(m.group(1)) if m else 0
+    return max(80, int(base * (1 + pct / 100)))
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng, fully local. Robotic, but always there and instant."""
+    name = "espeak"
+    container = "wav"
+    binary = "espeak-ng"
+
+    def __init__(self, voice, rate):
+        # Edge voice names mean nothing to espeak; use its own voice setting
+        super().__init__(os.environ.get("AUTOTUBE_ESPEAK_VOICE", "en-us"), rate)
+
+    def available(self):
+        return shutil.which(self.binary) is not None
+
+    async def synthesize(self, text):
+        audio = await self._run(
+            [self.binary, "-v", self.voice, "-s", str(rate_to_wpm(self.rate)), "--stdout", text]
+        )
+        return audio, None
+
+
+class PiperBackend(TTSBackend):
+    """Piper neural TTS, fully local. Needs AUTOTUBE_PIPER_MODEL (.onnx voice)."""
+    name = "piper"
+    container = "wav"
+    binary = "piper"
+
+    def __init__(self, voice, rate):
+        super().__init__(os.environ.get("AUTOTUBE_PIPER_MODEL", ""), rate)
+
+    def available(self):
+        return shutil.which(self.binary) is not None and os.path.exists(self.voice)
+
+    async def synthesize(self, text):
+        # length_scale > 1 is slower speech, so invert the rate percentage
+        length_scale = 175 / rate_to_wpm(self.rate)
+        # Piper seeks back to fix the WAV header, so it needs a real file
+        fd, wav_path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            await self._run(
+                [self.binary, "--model", self.voice, "--length_scale", f"{length_scale:.2f}",
+                 "--output_file", wav_path],
+                stdin=text.encode("utf-8"),
+            )
+            with open(wav_path, "rb") as f:
+                return f.read(), None
+        finally:
+            os.remove(wav_path)
+
+
+BACKENDS = {
+    "edge": EdgeBackend,
+    "espeak": EspeakBackend,
+    "piper": PiperBackend,
+}
+
+
+def get_backend(name, voice, rate):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend {name!r}, expected one of {tuple(BACKENDS)}")
+    return BACKENDS[name](voice, rate)
+
+
+def audio_duration(data, container):
+    """Length in seconds of one synthesized chunk."""
+    if container == "mp3":
+        return len(data) * 8 / EDGE_BITRATE
+    with wave.open(io.BytesIO(data)) as w:
+        # espeak writes a placeholder length when streaming, so count the PCM
+        pcm = w.readframes(w.getnframes())
+        return len(pcm) / (w.getsampwidth() * w.getnchannels() * w.getframerate())
+
+
+def join_wav(chunks, out_path):
+    """Concatenate WAV chunks (same format) and encode once to MP3 with ffmpeg."""
+    params = None
+    frames = []
+    for data in chunks:
+        with wave.open(io.BytesIO(data)) as w:
+            if params is None:
+                params = w.getparams()
+            elif w.getparams()[:3] != params[:3]:
+                raise ValueError("TTS chunks have different audio formats")
+            frames.append(w.readframes(w.getnframes()))
+
+    wav_path = os.path.splitext(out_path)[0] + ".wav"
+    with wave.open(wav_path, "wb") as w:
+        w.setparams(params)
+        for f in frames:
+            w.writeframes(f)
+
+    cmd = ["ffmpeg", "-y", "-i", wav_path, "-ac", "1", "-ar", "24000", "-b:a", "48k", out_path]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    os.remove(wav_path)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="ignore"))
@@ -0,0 +1,379 @@
+import os
+import sys
+import time
+import uuid
+import shutil
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import topic_index
+from pipeline_job import Job, THUMBNAIL_PATH, VIDEO_ID_PATH
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# One queue for every run and batch job, next to the scripts
+DB_PATH = os.environ.get("AUTOTUBE_UPLOAD_QUEUE", os.path.join(ROOT_DIR, "upload_queue.sqlite"))
+# Queued videos are copied here, so the next render can't overwrite them
+SPOOL_DIR = os.path.join(os.path.dirname(DB_PATH), "uploads")
+QUEUE_ID_PATH = os.path.join("data", "upload_queue_id.txt")
+
+UPLOAD_CONCURRENCY = int(os.environ.get("AUTOTUBE_UPLOAD_CONCURRENCY", "1"))
+UPLOAD_SPACING = float(os.environ.get("AUTOTUBE_UPLOAD_SPACING", "60"))   # seconds between upload starts
+# videos.insert costs 1600 of the default 10,000 daily quota units
+UPLOADS_PER_DAY = int(os.environ.get("AUTOTUBE_UPLOADS_PER_DAY", "6"))
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 300.0         # first retry after a failed upload, doubled each time
+POLL_INTERVAL = 5.0
+STALE_AFTER = 6 * 3600      # an "uploading" row this old belonged to a dead worker
+
+# Row states: pending -> uploading -> done, or failed after MAX_ATTEMPTS.
+# A video whose thumbnail failed goes done -> thumbnail -> thumbnailing ->
+# done: only the thumbnail is retried, the video is never sent again.
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS uploads (
+            id INTEGER PRIMARY KEY,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL DEFAULT 0,
+            workdir TEXT NOT NULL,
+            spool_dir TEXT NOT NULL DEFAULT '',
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            hashtags TEXT NOT NULL,
+            video_id TEXT NOT NULL DEFAULT '',
+            error TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS uploads_status ON uploads (status, next_attempt);
+        """
+    )
+    return conn
+
+# -----------------------------
+# Producer side
+# -----------------------------
+def enqueue(job):
+    """
+    Queue the job's rendered video (run from the job's workdir). The video
+    and thumbnail are copied into their own folder under uploads/ first, so
+    later renders in the same workdir are free to overwrite their own files.
+    """
+    video_path = job.video_path or "assets/latest_video/final.mp4"
+    if not os.path.exists(video_path):
+        raise FileNotFoundError("Latest video not found. Run video_creator_advanced.py first.")
+
+    spool_dir = os.path.join(SPOOL_DIR, uuid.uuid4().hex[:12])
+    os.makedirs(spool_dir)
+    try:
+        shutil.copyfile(video_path, os.path.join(spool_dir, "video.mp4"))
+        thumb_path = job.thumbnail_path or THUMBNAIL_PATH
+        if os.path.exists(thumb_path):
+            shutil.copyfile(thumb_path, os.path.join(spool_dir, "thumbnail.jpg"))
+
+        # The row only exists once the files are complete, so a failed copy
+        # never leaves an entry that no worker will pick up
+        conn = _connect()
+        try:
+            now = time.time()
+            upload_id = conn.execute(
+                "INSERT INTO uploads (created, updated, status, workdir, title, description, hashtags, spool_dir) "
+                "VALUES (?, ?, 'pending', ?, ?, ?, ?, ?)",
+                (now, now, os.path.abspath(job.workdir), job.title, job.description, job.hashtags, spool_dir),
+            ).lastrowid
+        finally:
+            conn.close()
+    except BaseException:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
+
+    os.makedirs(os.path.dirname(QUEUE_ID_PATH), exist_ok=True)
+    with open(QUEUE_ID_PATH, "w") as f:
+        f.write(str(upload_id))
+    print(f"📥 Queued upload #{upload_id}: {job.title}")
+    return upload_id
+
+# -----------------------------
+# Worker side
+# -----------------------------
+def claim():
+    """Atomically take the oldest due upload or thumbnail retry. Returns its row as a dict, or None."""
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        for running, queued in (("uploading", "pending"), ("thumbnailing", "thumbnail")):
+            conn.execute(
+                f"UPDATE uploads SET status = '{queued}', updated = ? "
+                f"WHERE status = '{running}' AND updated < ?",
+                (now, now - STALE_AFTER),
+            )
+        row = conn.execute(
+            "SELECT * FROM uploads WHERE status IN ('pending', 'thumbnail') AND next_attempt <= ? "
+            "ORDER BY next_attempt, id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is not None:
+            running = "uploading" if row["status"] == "pending" else "thumbnailing"
+            conn.execute(
+                "UPDATE uploads SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                (running, now, row["id"]),
+            )
+        conn.execute("COMMIT")
+        return dict(row) if row is not None else None
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def finish(upload_id, video_id):
+    """Record a published video. Called as soon as the insert returns."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE uploads SET status = 'done', video_id = ?, error = '', updated = ? WHERE id = ?",
+            (video_id, time.time(), upload_id),
+        )
+    finally:
+        conn.close()
+
+
+def retry_thumbnail(upload_id, attempts, error):
+    """Queue another try at just the thumbnail, or keep the video without one."""
+    status = "done" if attempts >= MAX_ATTEMPTS else "thumbnail"
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE uploads SET status = ?, attempts = ?, error = ?, next_attempt = ?, updated = ? WHERE id = ?",
+            (status, attempts, f"thumbnail: {error}"[:500],
+             time.time() + RETRY_DELAY * 2 ** (attempts - 1), time.time(), upload_id),
+        )
+    finally:
+        conn.close()
+    return status
+
+
+def fail(upload_id, attempts, error):
+    """Put the upload back with exponential delay, or give up after MAX_ATTEMPTS."""
+    status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE uploads SET status = ?, error = ?, next_attempt = ?, updated = ? WHERE id = ?",
+            (status, error[:500], time.time() + RETRY_DELAY * 2 ** (attempts - 1), time.time(), upload_id),
+        )
+    finally:
+        conn.close()
+    return status
+
+
+def uploads_since(seconds):
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM uploads WHERE status IN ('done', 'uploading', 'thumbnail', 'thumbnailing') "
+            "AND updated > ?",
+            (time.time() - seconds,),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def due_count():
+    """Uploads running or ready to run; scheduled retries wait for a later worker."""
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM uploads WHERE status IN ('uploading', 'thumbnailing') "
+            "OR (status IN ('pending', 'thumbnail') AND next_attempt <= ?)",
+            (time.time(),),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+class Pacer:
+    """Keeps upload starts `spacing` seconds apart across all worker threads."""
+
+    def __init__(self, spacing):
+        self.spacing = spacing
+        self.lock = threading.Lock()
+        self.last = 0.0
+
+    def wait(self):
+        with self.lock:
+            delay = self.last + self.spacing - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.last = time.monotonic()
+
+
+def upload_thumbnail(youtube, item, video_id, attempt):
+    """Set the spooled thumbnail. On failure only the thumbnail is queued again."""
+    import youtube_uploader
+
+    thumb_path = os.path.join(item["spool_dir"], "thumbnail.jpg")
+    if os.path.exists(thumb_path):
+        try:
+            youtube_uploader.set_thumbnail(youtube, video_id, thumb_path)
+        except Exception as e:
+            status = retry_thumbnail(item["id"], attempt, f"{type(e).__name__}: {e}")
+            print(f"⚠️ Thumbnail for upload #{item['id']} failed ({type(e).__name__}: {e}), "
+                  f"{'retrying later' if status == 'thumbnail' else 'giving up'}")
+            if status == "thumbnail":
+                return False
+        else:
+            finish(item["id"], video_id)
+    shutil.rmtree(item["spool_dir"], ignore_errors=True)
+    return True
+
+
+def upload_one(item):
+    import youtube_uploader
+
+    # get_service() keeps one client per worker thread (httplib2 isn't thread-safe)
+    youtube = youtube_uploader.get_service()
+    if item["status"] == "thumbnail":
+        # The video went up on an earlier attempt; never insert it again
+        return upload_thumbnail(youtube, item, item["video_id"], item["attempts"] + 1)
+
+    spool_dir = item["spool_dir"]
+    try:
+        video_id = youtube_uploader.upload_video(
+            youtube,
+            item["title"], item["description"], item["hashtags"],
+            os.path.join(spool_dir, "video.mp4"),
+            session_path=os.path.join(spool_dir, "session.json"),
+        )
+    except Exception as e:
+        status = fail(item["id"], item["attempts"] + 1, f"{type(e).__name__}: {e}")
+        print(f"❌ Upload #{item['id']} failed ({type(e).__name__}: {e}), now {status}")
+        return False
+
+    # Recorded before anything else can fail, so a retry can't publish it twice
+    finish(item["id"], video_id)
+    # Leave the ID where the job's own upload stage would have
+    id_path = os.path.join(item["workdir"], VIDEO_ID_PATH)
+    if os.path.isdir(os.path.dirname(id_path)):
+        with open(id_path, "w") as f:
+            f.write(video_id)
+    print(f"🚀 Upload #{item['id']} done: {video_id}")
+    upload_thumbnail(youtube, item, video_id, attempt=1)
+    return True
+
+
+def run_worker(concurrency=UPLOAD_CONCURRENCY, spacing=UPLOAD_SPACING,
+               per_day=UPLOADS_PER_DAY, until_idle=False, stop=None):
+    """
+    Drain the queue with `concurrency` uploads in flight, starting them at
+    least `spacing` seconds apart and at most `per_day` per 24 hours.
+    Returns when nothing due is left (or the daily limit is hit) if
+    `until_idle`, or once `stop` is set and the same holds.
+    """
+    pacer = Pacer(spacing)
+    slots = threading.BoundedSemaphore(concurrency)
+
+    def worker(item):
+        try:
+            upload_one(item)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            slots.acquire()
+            draining = until_idle or (stop is not None and stop.is_set())
+            if per_day and uploads_since(24 * 3600) >= per_day:
+                slots.release()
+                if draining:
+                    print(f"⏸️ Daily upload limit ({per_day}) reached, leaving the rest queued")
+                    break
+                print(f"⏸️ Daily upload limit ({per_day}) reached, waiting")
+                time.sleep(POLL_INTERVAL * 12)
+                continue
+
+            item = claim()
+            if item is None:
+                slots.release()
+                if draining and due_count() == 0:
+                    break
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            pacer.wait()
+            pool.submit(worker, item)
+
+        # Let uploads that are still running finish before returning
+        for _ in range(concurrency):
+            slots.acquire()
+
+
+def stop_on_eof(stop):
+    """Set `stop` once stdin closes: how pipeline_runner says "no more videos"."""
+    def watch():
+        sys.stdin.read()
+        stop.set()
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def list_uploads():
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT id, status, attempts, video_id, title, error FROM uploads ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    for upload_id, status, attempts, video_id, title, error in rows:
+        detail = video_id or error
+        print(f"#{upload_id:<5}{status:<10}{attempts:>3}  {title[:50]:<50}  {detail}")
+    return rows
+
+
+def main(job=None):
+    """Pipeline stage: queue this job's video instead of uploading it now."""
+    job = job or Job().load_artifacts()
+    enqueue(job)
+    topic_index.add_job(job)
+    return job
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent YouTube upload queue.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("enqueue", help="queue the video rendered in the current directory (default)")
+    sub.add_parser("list", help="show queued, finished and failed uploads")
+    worker = sub.add_parser("worker", help="upload queued videos")
+    worker.add_argument("--concurrency", type=int, default=UPLOAD_CONCURRENCY)
+    worker.add_argument("--spacing", type=float, default=UPLOAD_SPACING,
+                        help="minimum seconds between upload starts")
+    worker.add_argument("--per-day", type=int, default=UPLOADS_PER_DAY,
+                        help="uploads allowed per 24 hours (0 = no limit)")
+    worker.add_argument("--until-idle", action="store_true", help="exit once the queue is empty")
+    worker.add_argument("--until-eof", action="store_true",
+                        help="exit once stdin closes and the queue is empty")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command in (None, "enqueue"):
+        main()
+    elif args.command == "list":
+        list_uploads()
+    else:
+        stop = None
+        if args.until_eof:
+            stop = threading.Event()
+            stop_on_eof(stop)
+        run_worker(args.concurrency, args.spacing, args.per_day, args.until_idle, stop)
@@ -1,22 +1,51 @@
 import os
+import re
 import glob
+import time
+import argparse
 import subprocess
 import shutil
+from functools import lru_cache
 from moviepy import (
     AudioFileClip,
     ImageClip,
-    CompositeVideoClip,
-    concatenate_videoclips
+    VideoClip,
+    concatenate_videoclips,
 )
+from moviepy.config import FFMPEG_BINARY
+
+import captions
+import effects as fx
+import media_cache
+import timeline
+from image_normalizer import FRAME_WIDTH, FRAME_HEIGHT, normalize_images
 
 # Directories
 IMAGES_DIR = "assets/images"
 DATA_DIR = "data"
 VIDEOS_DIR = "assets/videos"
 LATEST_DIR = "assets/latest_video"
+SUBTITLES_DIR = "assets/subtitles"
+
+FPS = 30
+ATEMPO = 0.9    # narration is slowed down slightly before muxing
+RENDER_BACKENDS = ("moviepy", "ffmpeg")
+DEFAULT_BACKEND = os.environ.get("AUTOTUBE_RENDER_BACKEND", "moviepy")
 
-os.makedirs(VIDEOS_DIR, exist_ok=True)
-os.makedirs(LATEST_DIR, exist_ok=True)
+# x264 settings per use case. Slideshows are still images, so long GOPs and
+# -tune stillimage cost nothing visually and shrink files a lot.
+RENDER_PROFILES = {
+    "draft": {"preset": "ultrafast", "crf": 32, "gop": FPS * 10},      # review copies
+    "balanced": {"preset": "veryfast", "crf": 24, "gop": FPS * 4},
+    "archive": {"preset": "slow", "crf": 23, "gop": FPS * 10},         # small upload files
+}
+# Rough 1080x1920 still-image encode speed (frames/s per core) for auto mode
+PROFILE_FPS_PER_CORE = {"draft": 90.0, "balanced": 30.0, "archive": 6.0}
+DEFAULT_PROFILE = os.environ.get("AUTOTUBE_RENDER_PROFILE", "auto")
+DEFAULT_TIME_BUDGET = float(os.environ.get("AUTOTUBE_RENDER_BUDGET", "120"))
+CAPTIONS = os.environ.get("AUTOTUBE_CAPTIONS", "1") != "0"
+# Comma-separated names from effects.EFFECTS, e.g. "kenburns,xfade,fade"
+DEFAULT_EFFECTS = os.environ.get("AUTOTUBE_EFFECTS", "")
 
 # -----------------------------
 # Load images
@@ -37,19 +66,35 @@ def load_images():
 # -----------------------------
 # Process audio
 # -----------------------------
-def process_audio():
+def load_voice():
     raw_audio = os.path.join(DATA_DIR, "voice.mp3")
-    processed_audio = os.path.join(DATA_DIR, "voice_processed.mp3")
-
     if not os.path.exists(raw_audio):
         raise FileNotFoundError("data/voice.mp3 not found. Run voiceover first.")
+    return raw_audio
+
+
+def process_audio(raw_audio):
+    """
+    Tempo-adjusted narration as an uncompressed WAV, cached by input hash.
+    Only the MoviePy backend needs this; the ffmpeg backend applies atempo
+    in its final encode, so either way the voice is lossy-encoded once.
+    """
+    digest = media_cache.file_sha256(raw_audio)
+    processed_audio = os.path.join(media_cache.AUDIO_DIR, f"{digest}_atempo{ATEMPO}.wav")
+    if os.path.exists(processed_audio):
+        os.utime(processed_audio)
+        print("🎧 Using cached processed audio")
+        return processed_audio
 
+    os.makedirs(media_cache.AUDIO_DIR, exist_ok=True)
+    tmp_path = f"{processed_audio}.{os.getpid()}.tmp.wav"
     cmd = [
         "ffmpeg",
         "-y",
         "-i", raw_audio,
-        "-filter:a", "atempo=0.9",
-        processed_audio
+        "-filter:a", f"atempo={ATEMPO}",
+        "-c:a", "pcm_s16le",
+        tmp_path
     ]
 
     print("🎧 Processing audio with ffmpeg...")
@@ -57,55 +102,317 @@ def process_audio():
     if result.returncode != 0:
         raise RuntimeError(result.stderr.decode(errors="ignore"))
 
+    os.replace(tmp_path, processed_audio)
+    media_cache.evict_lru(media_cache.AUDIO_DIR, media_cache.AUDIO_CACHE_MAX_BYTES)
     return processed_audio
 
+def probe_duration(media_path):
+    """Media duration in seconds, read from ffmpeg's input banner."""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", media_path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr.decode(errors="ignore"))
+    if not match:
+        raise RuntimeError(f"Could not read duration of {media_path}")
+    h, m, sec = match.groups()
+    return int(h) * 3600 + int(m) * 60 + float(sec)
+
 # -----------------------------
-# Main video creator
+# Captions
+# -----------------------------
+def prepare_captions(timings_path=captions.TIMINGS_PATH):
+    """
+    ASS captions on the video's timeline (the voice is slowed by ATEMPO),
+    from the word timings the voiceover stage wrote. None if there are none.
+    """
+    timings = captions.load_timings(timings_path)
+    if not timings or not timings.get("words"):
+        print("⚠️ No word timings found, rendering without captions")
+        return None
+    words = captions.shift_words(timings["words"], scale=1 / ATEMPO)
+    return captions.write_ass(
+        captions.group_cues(words),
+        os.path.join(SUBTITLES_DIR, "captions.ass"),
+        FRAME_WIDTH, FRAME_HEIGHT,
+    )
+
+
+@lru_cache(maxsize=None)
+def has_filter(name, ffmpeg="ffmpeg"):
+    """True if this ffmpeg build has the filter (subtitles needs libass)."""
+    try:
+        result = subprocess.run([ffmpeg, "-hide_banner", "-filters"], capture_output=True, text=True)
+    except OSError:
+        return False
+    return any(line.split()[1:2] == [name] for line in result.stdout.splitlines())
+
+
+def can_burn_captions(backend):
+    # MoviePy encodes with its own ffmpeg binary, which may be a different build
+    ffmpeg = FFMPEG_BINARY if backend == "moviepy" else "ffmpeg"
+    if has_filter("subtitles", ffmpeg):
+        return True
+    print(f"⚠️ {ffmpeg} has no subtitles filter (built without libass), rendering without captions")
+    return False
+
+
+def subtitles_filter(subtitles_path):
+    """ffmpeg filter that burns the captions in while the frames are encoded."""
+    path = os.path.abspath(subtitles_path).replace("\\", "/").replace("'", r"'\''")
+    return f"subtitles=filename='{path}'"
+
+# -----------------------------
+# Encoder profiles
+# -----------------------------
+def pick_profile(duration, time_budget=DEFAULT_TIME_BUDGET, cores=None):
+    """Best-quality profile whose estimated encode time fits the budget."""
+    cores = cores or os.cpu_count() or 1
+    frames = duration * FPS
+    for name in ("archive", "balanced", "draft"):
+        estimate = frames / (PROFILE_FPS_PER_CORE[name] * cores)
+        if estimate <= time_budget:
+            return name
+    return "draft"
+
+
+def resolve_profile(profile, duration, time_budget=DEFAULT_TIME_BUDGET):
+    if profile == "auto":
+        profile = pick_profile(duration, time_budget)
+        print(f"⚙️ Auto-selected render profile: {profile} ({os.cpu_count()} cores, {time_budget:.0f}s budget)")
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile {profile!r}, expected one of {PROFILE_CHOICES}")
+    settings = dict(RENDER_PROFILES[profile])
+    settings["threads"] = os.cpu_count() or 1
+    return profile, settings
+
+
+def x264_params(settings):
+    """Rate control and GOP flags shared by both backends."""
+    return [
+        "-crf", str(settings["crf"]),
+        "-tune", "stillimage",
+        "-g", str(settings["gop"]),
+        "-keyint_min", str(settings["gop"]),
+    ]
+
+# -----------------------------
+# Render backends
 # -----------------------------
-def main():
-    # 1. Audio
-    audio_path = process_audio()
-    audio = AudioFileClip(audio_path)
-    duration = audio.duration
-
-    # 2. Images
-    image_files = load_images()
-    per_image = duration / max(len(image_files), 1)
-
-    width, height = 1080, 1920
-    clips = []
-
-    for img in image_files:
-        clip = (
-            ImageClip(img)
-            .resized(height=height)
-            .with_duration(per_image)
+# Each backend gets the normalized frames and a timeline of segments
+# ({"image": index into frame_files, "start", "end"}) built by timeline.py.
+
+def render_moviepy(frame_files, segments, audio_path, output_path, settings,
+                   subtitles_path=None, effects=()):
+    audio = AudioFileClip(process_audio(audio_path))
+    durations = timeline.durations(segments)
+    overlap = fx.xfade_duration(durations) if "xfade" in effects else 0.0
+
+    stills = []
+    for i, (seg, length) in enumerate(zip(segments, fx.clip_lengths(durations, overlap))):
+        clip = ImageClip(frame_files[seg["image"]]).with_duration(length)
+        if "kenburns" in effects:
+            frame_function = fx.kenburns_frames(clip.get_frame(0), length, FPS, zoom_in=i % 2 == 0)
+            clip = VideoClip(frame_function, duration=length)
+        stills.append(clip)
+
+    clips = stills
+    if overlap:
+        # Each crossfade is its own short clip blending the two stills; the
+        # rest of every still plays untouched, so nothing is composited
+        clips = [stills[0].subclipped(0, durations[0])]
+        for i in range(1, len(stills)):
+            blend = fx.crossfade_frames(stills[i - 1].get_frame, stills[i].get_frame, durations[i - 1], overlap, FPS)
+            clips.append(VideoClip(blend, duration=overlap))
+            clips.append(stills[i].subclipped(overlap, durations[i]))
+
+    # All frames share one size, so clips can be chained without compositing
+    base_video = concatenate_videoclips(clips, method="chain")
+
+    if "fade" in effects:
+        weights = fx.fade_weights(round(base_video.duration * FPS) + 1, FPS, base_video.duration)
+        base_video = base_video.transform(
+            lambda get_frame, t: (get_frame(t) * weights[min(int(t * FPS), len(weights) - 1)]).astype("uint8")
+        )
+    final_video = base_video.with_audio(audio)
+
+    final_video.write_videofile(
+        output_path,
+        fps=FPS,
+        codec="libx264",
+        audio_codec="aac",
+        preset=settings["preset"],
+        threads=settings["threads"],
+        ffmpeg_params=[
+            *x264_params(settings),
+            *(["-vf", subtitles_filter(subtitles_path)] if subtitles_path else []),
+        ],
+    )
+
+
+def write_concat_list(frame_files, segments, list_path):
+    """ffconcat playlist with one entry per timeline segment and its display time."""
+    lines = ["ffconcat version 1.0"]
+    for seg, d in zip(segments, timeline.durations(segments)):
+        lines.append(f"file '{os.path.abspath(frame_files[seg['image']])}'")
+        lines.append(f"duration {d:.3f}")
+    # The concat demuxer ignores the last duration unless the file is repeated
+    lines.append(f"file '{os.path.abspath(frame_files[segments[-1]['image']])}'")
+
+    with open(list_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return list_path
+
+
+def ffmpeg_video_args(frame_files, segments, audio_path, subtitles_path=None, effects=()):
+    """Inputs, filters and maps: the concat demuxer for hard cuts, a filter graph for effects."""
+    post_filters = [subtitles_filter(subtitles_path)] if subtitles_path else []
+    post_filters.append("format=yuv420p")
+
+    if not effects:
+        list_path = write_concat_list(
+            frame_files, segments, os.path.join(VIDEOS_DIR, "frames.ffconcat")
         )
-        clips.append(clip)
+        return [
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", audio_path,
+            "-map", "0:v", "-map", "1:a",
+            "-vf", ",".join([f"fps={FPS}", *post_filters]),
+        ]
+
+    durations = timeline.durations(segments)
+    graph = fx.ffmpeg_graph(durations, effects, FRAME_WIDTH, FRAME_HEIGHT, FPS, post_filters)
+    return [
+        *fx.ffmpeg_inputs(frame_files, segments),
+        "-i", audio_path,
+        "-filter_complex", graph,
+        "-map", "[v]", "-map", f"{len(segments)}:a",
+    ]
+
+
+def render_ffmpeg(frame_files, segments, audio_path, output_path, settings,
+                  subtitles_path=None, effects=()):
+    """
+    Single ffmpeg pass: stills through the concat demuxer (or the effects
+    filter graph), the raw voice slowed with atempo and muxed in the same
+    invocation, captions burned in by the filter chain. Encoding settings
+    mirror the MoviePy path (libx264, yuv420p, 30fps, stereo AAC at 44.1kHz).
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        *ffmpeg_video_args(frame_files, segments, audio_path, subtitles_path, effects),
+        "-af", f"atempo={ATEMPO}",
+        "-c:v", "libx264",
+        "-preset", settings["preset"],
+        *x264_params(settings),
+        "-threads", str(settings["threads"]),
+        "-c:a", "aac", "-ar", "44100", "-ac", "2",
+        "-shortest",
+        output_path,
+    ]
+
+    print("🎞️ Rendering with ffmpeg...")
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="ignore"))
+
+
+RENDERERS = {
+    "moviepy": render_moviepy,
+    "ffmpeg": render_ffmpeg,
+}
+PROFILE_CHOICES = ("auto", *RENDER_PROFILES)
+
+# -----------------------------
+# Main video creator
+# -----------------------------
+def render(backend, output_path, profile=DEFAULT_PROFILE, time_budget=DEFAULT_TIME_BUDGET,
+           audio_path=None, image_files=None, burn_captions=CAPTIONS, effects=DEFAULT_EFFECTS):
+    """Prepare audio and frames, then render with `backend`. Returns seconds taken."""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    os.makedirs(VIDEOS_DIR, exist_ok=True)
+
+    # 1. Audio (tempo is applied by the backend, so scale the raw length)
+    audio_path = audio_path or load_voice()
+    duration = probe_duration(audio_path) / ATEMPO
+
+    # 2. Images (pre-normalized to 1080x1920 so frames need no per-frame resize)
+    image_files = image_files or load_images()
+    frame_files = normalize_images(image_files, FRAME_WIDTH, FRAME_HEIGHT)
+
+    # Cuts follow the narration's sentence boundaries (voice timings are
+    # pre-atempo, so they are stretched onto the video's timeline)
+    segments = timeline.load_or_build(len(frame_files), duration, scale=1 / ATEMPO)
+
+    # 3. Captions (burned in by the encoder, no extra pass)
+    subtitles_path = prepare_captions() if burn_captions and can_burn_captions(backend) else None
 
-    base_video = concatenate_videoclips(clips, method="compose")
-    final_video = CompositeVideoClip([base_video]).with_audio(audio)
+    # 4. Encode
+    profile, settings = resolve_profile(profile, duration, time_budget)
+    start = time.perf_counter()
+    effects = fx.parse_effects(effects)
+    RENDERERS[backend](frame_files, segments, audio_path, output_path, settings, subtitles_path, effects)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ {backend} render ({profile}{', ' + '+'.join(effects) if effects else ''}) took {elapsed:.2f}s")
+    return elapsed
+
+
+def main(job=None, backend=DEFAULT_BACKEND, profile=DEFAULT_PROFILE, time_budget=DEFAULT_TIME_BUDGET,
+         burn_captions=CAPTIONS, effects=DEFAULT_EFFECTS):
+    if backend not in RENDERERS:
+        raise ValueError(f"Unknown render backend {backend!r}, expected one of {RENDER_BACKENDS}")
 
-    # 3. Output paths
     output_video_path = os.path.join(
         VIDEOS_DIR,
         "video_output.mp4"
     )
-
-    # 4. Write video
-    final_video.write_videofile(
-        output_video_path,
-        fps=30,
-        codec="libx264",
-        audio_codec="aac"
+    render(
+        backend, output_video_path, profile, time_budget,
+        audio_path=job and job.voice_path,
+        image_files=job and job.image_paths,
+        burn_captions=burn_captions,
+        effects=effects,
     )
 
-    # 5. Update latest video
+    # Update latest video
+    os.makedirs(LATEST_DIR, exist_ok=True)
     latest_video_path = os.path.join(LATEST_DIR, "final.mp4")
     shutil.copy(output_video_path, latest_video_path)
 
     print("✅ Latest video updated:", latest_video_path)
     print("🎬 Video created successfully:", output_video_path)
 
+    if job is not None:
+        job.video_path = latest_video_path
+    return job
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render the slideshow video.")
+    parser.add_argument(
+        "--backend", choices=RENDER_BACKENDS, default=DEFAULT_BACKEND,
+        help="moviepy (per-frame Python) or ffmpeg (single native pass)",
+    )
+    parser.add_argument(
+        "--profile", choices=PROFILE_CHOICES, default=DEFAULT_PROFILE,
+        help="encoder profile; auto picks one from CPU count and --time-budget",
+    )
+    parser.add_argument(
+        "--time-budget", type=float, default=DEFAULT_TIME_BUDGET,
+        help="seconds the encode may take when --profile auto",
+    )
+    parser.add_argument(
+        "--no-captions", dest="captions", action="store_false", default=CAPTIONS,
+        help="don't burn word-timed captions into the video",
+    )
+    parser.add_argument(
+        "--effects", default=DEFAULT_EFFECTS,
+        help=f"comma-separated slideshow effects from {', '.join(fx.EFFECTS)} (default: hard cuts)",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(backend=args.backend, profile=args.profile, time_budget=args.time_budget,
+         burn_captions=args.captions, effects=args.effects)
@@ -1,6 +1,14 @@
 import os
+import json
+import time
 import asyncio
-import edge_tts
+import argparse
+import hashlib
+
+import captions
+import media_cache
+import tts_backends
+from text_utils import split_sentences
 
 DATA_DIR = "data"
 
@@ -8,13 +16,99 @@ DATA_DIR = "data"
 VOICE = "en-US-GuyNeural"   # male-ish English voice
 RATE = "+0%"                # speed, e.g. "-10%", "+20%"
 
-async def generate_voice():
-    script_path = os.path.join(DATA_DIR, "script.txt")
-    if not os.path.exists(script_path):
-        raise FileNotFoundError("data/script.txt not found. Run script_caption_hashtags.py first.")
+TTS_CONCURRENCY = 4         # sentences synthesized at the same time
+TTS_TIMEOUT = 20.0          # seconds per sentence before falling back
+
+# Primary engine and the local engine used when it fails or times out
+TTS_BACKEND = os.environ.get("AUTOTUBE_TTS", "edge")
+TTS_FALLBACK = os.environ.get("AUTOTUBE_TTS_FALLBACK", "espeak")
+
+# -----------------------------
+# Per-sentence cache
+# -----------------------------
+def chunk_cache_path(backend, text):
+    key = hashlib.sha256(f"{backend.cache_tag()}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(media_cache.TTS_DIR, f"{key}.{backend.container}")
+
+
+def read_words(path):
+    try:
+        os.utime(path)
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+async def synthesize_chunk(backend, text, semaphore):
+    """
+    Audio and word timings for one sentence, from cache or the backend.
+    Returns (bytes, words or None, cache hit).
+    """
+    path = chunk_cache_path(backend, text)
+    words_path = f"{path}.words.json"
+    if os.path.exists(path):
+        os.utime(path)
+        with open(path, "rb") as f:
+            return f.read(), read_words(words_path), True
+
+    async with semaphore:
+        audio, words = await asyncio.wait_for(backend.synthesize(text), TTS_TIMEOUT)
+
+    if not audio:
+        raise RuntimeError(f"No audio returned for: {text!r}")
+
+    os.makedirs(media_cache.TTS_DIR, exist_ok=True)
+    if words:
+        with open(words_path, "w") as f:
+            json.dump(words, f)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(audio)
+    os.replace(tmp_path, path)
+    return audio, words, False
 
-    with open(script_path, "r") as f:
-        text = f.read().strip()
+
+async def synthesize_all(backend, sentences):
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+    tasks = [asyncio.create_task(synthesize_chunk(backend, s, semaphore)) for s in sentences]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+
+
+def write_timings(backend, sentences, results):
+    """
+    Place each sentence's word timings on the joined voice track and write
+    data/timings.json plus an SRT for the video stage's captions. Engines
+    without word boundaries get timings estimated from word length.
+    """
+    offset = 0.0
+    sentence_times, all_words = [], []
+    for text, (audio, words, _) in zip(sentences, results):
+        length = tts_backends.audio_duration(audio, backend.container)
+        if not words:
+            words = captions.estimate_words(text, length)
+        all_words.extend(captions.shift_words(words, offset))
+        sentence_times.append({"text": text.strip(), "start": round(offset, 3), "end": round(offset + length, 3)})
+        offset += length
+
+    captions.save_timings(sentence_times, all_words)
+    captions.write_srt(captions.group_cues(all_words), captions.CAPTIONS_PATH)
+
+
+async def generate_voice(text=None, backend_name=TTS_BACKEND, fallback_name=TTS_FALLBACK):
+    if text is None:
+        script_path = os.path.join(DATA_DIR, "script.txt")
+        if not os.path.exists(script_path):
+            raise FileNotFoundError("data/script.txt not found. Run script_caption_hashtags.py first.")
+
+        with open(script_path, "r") as f:
+            text = f.read()
+    text = text.strip()
 
     if not text:
         raise ValueError("Script is empty.")
@@ -22,12 +116,57 @@ async def generate_voice():
     os.makedirs(DATA_DIR, exist_ok=True)
     out_path = os.path.join(DATA_DIR, "voice.mp3")
 
-    communicate = edge_tts.Communicate(text, voice=VOICE, rate=RATE)
-    await communicate.save(out_path)
-    print(f"✅ Microsoft voice generated: {out_path}")
+    # One request per sentence, run concurrently; editing a sentence in
+    # review only re-synthesizes that sentence.
+    sentences = split_sentences(text) or [text]
+    start = time.perf_counter()
+
+    backend = tts_backends.get_backend(backend_name, VOICE, RATE)
+    try:
+        if not backend.available():
+            raise RuntimeError(f"{backend.name} backend is not available")
+        results = await synthesize_all(backend, sentences)
+    except Exception as e:
+        if not fallback_name or fallback_name == backend_name:
+            raise
+        # Redo the whole script on the fallback so the voice doesn't change mid-video
+        print(f"⚠️ {backend.name} TTS failed ({type(e).__name__}: {e}), falling back to {fallback_name}")
+        backend = tts_backends.get_backend(fallback_name, VOICE, RATE)
+        if not backend.available():
+            raise RuntimeError(f"Fallback TTS backend {fallback_name} is not available") from e
+        results = await synthesize_all(backend, sentences)
+
+    if backend.container == "mp3":
+        # Edge TTS returns headerless MP3 frames at a fixed bitrate, so the
+        # chunks can be joined byte for byte without gaps or re-encoding.
+        with open(out_path, "wb") as f:
+            for audio, _, _ in results:
+                f.write(audio)
+    else:
+        tts_backends.join_wav([audio for audio, _, _ in results], out_path)
+    write_timings(backend, sentences, results)
+
+    hits = sum(hit for _, _, hit in results)
+    print(
+        f"⏱️ {len(sentences)} sentences voiced with {backend.name} in "
+        f"{time.perf_counter() - start:.2f}s ({hits} from cache)"
+    )
+    media_cache.evict_lru(media_cache.TTS_DIR, media_cache.TTS_CACHE_MAX_BYTES)
+    print(f"✅ Voice generated: {out_path}")
+    return out_path
 
-def main():
-    asyncio.run(generate_voice())
+def main(job=None, backend=TTS_BACKEND, fallback=TTS_FALLBACK):
+    voice_path = asyncio.run(generate_voice(job.script if job else None, backend, fallback))
+    if job is not None:
+        job.voice_path = voice_path
+    return job
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Turn data/script.txt into data/voice.mp3.")
+    parser.add_argument("--tts-backend", choices=tuple(tts_backends.BACKENDS), default=TTS_BACKEND)
+    parser.add_argument(
+        "--fallback", default=TTS_FALLBACK,
+        help="backend used if the primary fails or times out ('' to disable)",
+    )
+    args = parser.parse_args()
+    main(backend=args.tts_backend, fallback=args.fallback)
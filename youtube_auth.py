@@ -0,0 +1,129 @@
+import os
+import json
+import datetime
+import threading
+
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+
+SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
+TOKEN_PATH = "token.json"
+CLIENT_SECRET_PATH = "client_secret.json"
+
+REFRESH_MARGIN = 300    # refresh this many seconds before the access token expires
+
+
+class CredentialManager:
+    """
+    OAuth credentials for one token file, shared by every upload in the
+    process. Access tokens are refreshed shortly before they expire (not
+    after a failed request) and written back atomically, so other processes
+    and later runs start from a valid token instead of the browser flow.
+    """
+
+    def __init__(self, token_path=TOKEN_PATH, client_secret_path=CLIENT_SECRET_PATH, scopes=SCOPES):
+        # Batch job dirs symlink token.json; write through to the real file
+        self.token_path = os.path.realpath(token_path)
+        self.client_secret_path = client_secret_path
+        self.scopes = scopes
+        self.creds = None
+        self.loaded_mtime = None
+        self.lock = threading.Lock()
+
+    def _load(self):
+        mtime = os.path.getmtime(self.token_path)
+        if self.creds is None or mtime != self.loaded_mtime:
+            # First use, or another process refreshed the file since
+            self.creds = Credentials.from_authorized_user_file(self.token_path, self.scopes)
+            self.loaded_mtime = mtime
+
+    def _save(self):
+        tmp_path = f"{self.token_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.creds.to_json())
+        os.replace(tmp_path, self.token_path)
+        self.loaded_mtime = os.path.getmtime(self.token_path)
+
+    def _authorize(self):
+        flow = InstalledAppFlow.from_client_secrets_file(self.client_secret_path, self.scopes)
+        self.creds = flow.run_local_server(port=0)
+        self._save()
+
+    def _expires_soon(self):
+        if self.creds.expiry is None:
+            return False
+        # google-auth keeps expiry as naive UTC
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        remaining = self.creds.expiry - now
+        return remaining.total_seconds() < REFRESH_MARGIN
+
+    def get(self):
+        """Credentials valid for at least REFRESH_MARGIN more seconds."""
+        with self.lock:
+            if not os.path.exists(self.token_path):
+                self._authorize()
+                return self.creds
+
+            self._load()
+            if self.creds.valid and not self._expires_soon():
+                return self.creds
+
+            if self.creds.refresh_token:
+                try:
+                    self.creds.refresh(Request())
+                    self._save()
+                    print("🔑 Refreshed YouTube access token")
+                    return self.creds
+                except RefreshError as e:
+                    print(f"⚠️ Token refresh failed ({e}), signing in again")
+            self._authorize()
+            return self.creds
+
+    def persist(self):
+        """Write back a token the HTTP layer refreshed by itself (after a 401)."""
+        with self.lock:
+            if self.creds is None or not os.path.exists(self.token_path):
+                return
+            with open(self.token_path) as f:
+                saved = json.load(f).get("token")
+            if self.creds.token and self.creds.token != saved:
+                self._save()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+_local = threading.local()
+
+
+def credential_manager(token_path=TOKEN_PATH):
+    key = os.path.realpath(token_path)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = CredentialManager(token_path)
+        return _managers[key]
+
+
+def get_service(token_path=TOKEN_PATH):
+    """
+    Long-lived YouTube client for this thread. It is built once from the
+    discovery document bundled with google-api-python-client (no discovery
+    request), and its HTTP connection is reused for every upload and
+    thumbnail call. Each thread gets its own client because httplib2
+    connections are not thread-safe; all of them share one set of
+    credentials, checked for expiry on every call.
+    """
+    manager = credential_manager(token_path)
+    creds = manager.get()
+
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+    entry = services.get(manager.token_path)
+    if entry is None or entry[0] is not creds:
+        service = build("youtube", "v3", credentials=creds, static_discovery=True, cache_discovery=False)
+        entry = services[manager.token_path] = (creds, service)
+    return entry[1]
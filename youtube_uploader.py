@@ -1,34 +1,192 @@
 import os
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import json
+import time
+import random
+import hashlib
+import http.client
+
+import httplib2
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
-from google.oauth2.credentials import Credentials
 
-SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
+import topic_index
+import youtube_auth
+from pipeline_job import Job, THUMBNAIL_PATH
+
+# Resumable upload settings
+CHUNK_MB = float(os.environ.get("AUTOTUBE_UPLOAD_CHUNK_MB", "8"))
+MAX_RETRIES = int(os.environ.get("AUTOTUBE_UPLOAD_RETRIES", "10"))
+MAX_BACKOFF = 64.0          # seconds
+RETRIABLE_STATUS = (500, 502, 503, 504)
+RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, http.client.HTTPException, OSError)
+SESSION_PATH = os.path.join("data", "upload_session.json")
 
 # -----------------------------
 # YouTube service
 # -----------------------------
 def get_service():
-    if not os.path.exists("token.json"):
-        flow = InstalledAppFlow.from_client_secrets_file(
-            "client_secret.json", SCOPES
-        )
-        creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as f:
-            f.write(creds.to_json())
-    else:
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+    """This thread's cached client, with credentials refreshed ahead of expiry."""
+    return youtube_auth.get_service()
+
+# -----------------------------
+# Chunked resumable upload
+# -----------------------------
+def chunk_bytes(mb=CHUNK_MB):
+    """Chunk size in bytes, rounded to the 256 KiB multiple the API requires."""
+    unit = 256 * 1024
+    return max(unit, int(mb * 1024 * 1024) // unit * unit)
+
+
+def session_key(video_path, body):
+    """Identifies one upload: the same file with the same metadata."""
+    st = os.stat(video_path)
+    blob = json.dumps([os.path.abspath(video_path), st.st_size, st.st_mtime_ns, body], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def load_session(key, path=SESSION_PATH):
+    try:
+        with open(path) as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return session.get("uri") if session.get("key") == key else None
+
+
+def save_session(key, uri, path=SESSION_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "uri": uri, "saved": time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+def clear_session(path=SESSION_PATH):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def range_offset(resp):
+    """Bytes the server has, from a "Range: bytes=0-N" header, or None without one."""
+    if "range" not in resp:
+        return None
+    return int(resp["range"].split("-")[1]) + 1
+
+
+def sync_progress(request):
+    """
+    Ask the server how much of the file it already has (an empty PUT on
+    the session URI) and continue from there. Needed after a failed chunk
+    and when resuming a saved session. Returns the final response if the
+    upload turns out to be complete, else None.
+    """
+    size = request.resumable.size()
+    resp, content = request.http.request(
+        request.resumable_uri, "PUT",
+        headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"},
+    )
+    if resp.status in (200, 201):
+        return request.postproc(resp, content)
+    if resp.status != 308:
+        raise HttpError(resp, content, uri=request.resumable_uri)
+    # No Range header on a 308 means nothing yet
+    request.resumable_progress = range_offset(resp) or 0
+    return None
+
+
+def resumable_upload(request, key, session_path=SESSION_PATH, max_retries=MAX_RETRIES):
+    """
+    Drive a resumable media request chunk by chunk with next_chunk().
+    Retriable failures (5xx, dropped connections) back off exponentially
+    and continue from the last byte the server confirmed. The session URI
+    is saved to `session_path`, so a restarted process picks up the same
+    upload instead of sending the file again. Returns the final response.
+    """
+    size = request.resumable.size()
+    uri = load_session(key, session_path)
+    # Set after a failure that didn't say how much arrived: the server may
+    # have stored more or less of the last chunk, so ask before the next one
+    in_error = False
+    if uri:
+        request.resumable_uri = uri
+        in_error = True
+        print("🔁 Resuming previous upload session")
+
+    start = time.perf_counter()
+    sent = 0
+    retries = 0
+    response = None
+    while response is None:
+        before = request.resumable_progress
+        chunk_start = time.perf_counter()
+        try:
+            if in_error and request.resumable_uri:
+                response = sync_progress(request)
+                before = size if response is not None else request.resumable_progress
+                in_error = False
+            if response is None:
+                status, response = request.next_chunk()
+        except HttpError as e:
+            # Also covers ResumableUploadError, when a session can't be started
+            in_error = True
+            if e.resp.status in (404, 410) and request.resumable_uri:
+                # Session expired on the server: start over with a new one
+                print("⚠️ Upload session expired, starting a new one")
+                clear_session(session_path)
+                request.resumable_uri = None
+                request.resumable_progress = 0
+                in_error = False
+                continue
+            if e.resp.status not in RETRIABLE_STATUS:
+                raise
+            error = f"HTTP {e.resp.status}"
+            offset = range_offset(e.resp)
+            if offset is not None and request.resumable_uri:
+                # The error already says how much arrived; no need to ask
+                request.resumable_progress = offset
+                in_error = False
+        except RETRIABLE_EXCEPTIONS as e:
+            in_error = True
+            error = f"{type(e).__name__}: {e}"
+        else:
+            retries = 0
+            if request.resumable_uri and request.resumable_uri != uri:
+                uri = request.resumable_uri
+                save_session(key, uri, session_path)
 
-    return build("youtube", "v3", credentials=creds)
+            done = size if response is not None else request.resumable_progress
+            if done > before:
+                # One call sends at most one chunk; the rest was already on the server
+                chunk = min(done - before, request.resumable.chunksize())
+                sent += chunk
+                mb = chunk / (1024 * 1024)
+                rate = mb / max(time.perf_counter() - chunk_start, 1e-9)
+                print(f"⬆️ {done / max(size, 1) * 100:5.1f}% ({done / (1024 * 1024):.1f} MB) at {rate:.2f} MB/s")
+            continue
+
+        retries += 1
+        if retries > max_retries:
+            raise RuntimeError(f"Upload failed after {max_retries} retries ({error})")
+        delay = min(2 ** retries, MAX_BACKOFF) * random.uniform(0.5, 1.0)
+        print(f"⚠️ Upload error ({error}), retry {retries}/{max_retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+    elapsed = time.perf_counter() - start
+    clear_session(session_path)
+    print(
+        f"⏱️ Sent {sent / (1024 * 1024):.1f} MB in {elapsed:.1f}s "
+        f"({sent / (1024 * 1024) / max(elapsed, 1e-9):.2f} MB/s)"
+    )
+    return response
 
 # -----------------------------
 # Main uploader
 # -----------------------------
-def main():
-    youtube = get_service()
+def load_metadata(job=None):
+    """(title, description, hashtags) from the job or data/*.txt."""
+    if job is not None:
+        return job.title, job.description, job.hashtags
 
-    # Load metadata
     with open("data/title.txt") as f:
         title = f.read().strip()
 
@@ -37,11 +195,21 @@ def main():
 
     with open("data/hashtags.txt") as f:
         hashtags = f.read().strip()
+    return title, desc, hashtags
 
-    full_description = f"{desc}\n\n{hashtags}"
 
-    # ✅ FIX: Always upload latest video
-    video_path = "assets/latest_video/final.mp4"
+def set_thumbnail(youtube, video_id, thumb_path):
+    print("🖼 Uploading thumbnail...")
+    youtube.thumbnails().set(videoId=video_id, media_body=thumb_path).execute()
+
+
+def upload_video(youtube, title, desc, hashtags, video_path, thumb_path=None, session_path=SESSION_PATH):
+    """
+    Upload one video, then its thumbnail if one is given. Returns the video
+    ID. A failed thumbnail is only logged: the video is already published,
+    and retrying the whole call would publish it twice.
+    """
+    full_description = f"{desc}\n\n{hashtags}"
 
     if not os.path.exists(video_path):
         raise FileNotFoundError(
@@ -50,36 +218,62 @@ def main():
 
     print("⬆️ Uploading video:", video_path)
 
+    body = {
+        "snippet": {
+            "title": title,
+            "description": full_description,
+            "categoryId": "28",  # Science & Technology
+        },
+        "status": {
+            "privacyStatus": "public"
+        }
+    }
     upload_request = youtube.videos().insert(
         part="snippet,status",
-        body={
-            "snippet": {
-                "title": title,
-                "description": full_description,
-                "categoryId": "28",  # Science & Technology
-            },
-            "status": {
-                "privacyStatus": "public"
-            }
-        },
-        media_body=MediaFileUpload(video_path, resumable=True)
+        body=body,
+        media_body=MediaFileUpload(
+            video_path, mimetype="video/mp4", chunksize=chunk_bytes(), resumable=True
+        )
     )
 
-    response = upload_request.execute()
+    response = resumable_upload(upload_request, session_key(video_path, body), session_path)
     video_id = response["id"]
 
     print(f"✅ Video uploaded successfully! Video ID: {video_id}")
 
     # Thumbnail (optional)
-    thumb_path = "assets/images/thumbnail.jpg"
-    if os.path.exists(thumb_path):
-        print("🖼 Uploading thumbnail...")
-        youtube.thumbnails().set(
-            videoId=video_id,
-            media_body=thumb_path
-        ).execute()
+    if thumb_path and os.path.exists(thumb_path):
+        try:
+            set_thumbnail(youtube, video_id, thumb_path)
+        except Exception as e:
+            print(f"⚠️ Thumbnail upload failed ({type(e).__name__}: {e}), the video is live without it")
+
+    # The HTTP layer may have refreshed the token after a 401; keep it
+    youtube_auth.credential_manager().persist()
+    return video_id
+
+
+def main(job=None):
+    youtube = get_service()
+    title, desc, hashtags = load_metadata(job)
+
+    # ✅ FIX: Always upload latest video
+    video_path = (job and job.video_path) or "assets/latest_video/final.mp4"
+
+    thumb_path = (job and job.thumbnail_path) or THUMBNAIL_PATH
+
+    video_id = upload_video(youtube, title, desc, hashtags, video_path, thumb_path)
+
+    os.makedirs("data", exist_ok=True)
+    with open("data/video_id.txt", "w") as f:
+        f.write(video_id)
 
     print("🚀 Upload complete.")
+    topic_index.add_job(job or Job().load_text())
+
+    if job is not None:
+        job.video_id = video_id
+    return job
 
 # -----------------------------
 if __name__ == "__main__":